@@ -24,6 +24,9 @@ def init_database():
     
     print("✅ Connected to database")
     
+    # WAL is stored in the database file, so the app starts out with concurrent readers
+    cursor.execute('PRAGMA journal_mode=WAL')
+    
     # Create food logs table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS food_logs (
@@ -79,6 +82,29 @@ def init_database():
     ''')
     print("✅ reminders_todos table created")
     
+    # Create standalone reminders table (food macro reminders)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            scheduled_time DATETIME NOT NULL,
+            sent BOOLEAN DEFAULT FALSE,
+            completed_at DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create todos table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS todos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            completed_at DATETIME
+        )
+    ''')
+    print("✅ reminders and todos tables created")
+    
     # Create calendar events cache table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS calendar_events (
@@ -94,6 +120,71 @@ def init_database():
     ''')
     print("✅ calendar_events table created")
     
+    # Create processed messages table for Gmail webhook de-duplication
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS processed_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT UNIQUE NOT NULL,
+            processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    print("✅ processed_messages table created")
+    
+    # Create message cache table so Gmail messages aren't downloaded twice
+    # (body is NULL for messages that aren't Google Voice SMS)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS message_cache (
+            message_id TEXT PRIMARY KEY,
+            body TEXT,
+            timestamp TEXT,
+            fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    print("✅ message_cache table created")
+    
+    # Create sync state table (e.g. the last Gmail historyId seen)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    print("✅ sync_state table created")
+    
+    # Create indexes for the reminder checker and morning check-in
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reminders_todos_due
+        ON reminders_todos (type, completed, due_date)
+    ''')
+    print("✅ reminders_todos indexes created")
+    
+    # Create partial indexes over just the open rows
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reminders_todos_open_due
+        ON reminders_todos (due_date) WHERE completed_at IS NULL
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reminders_pending
+        ON reminders (scheduled_time) WHERE sent = FALSE AND completed_at IS NULL
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_todos_open
+        ON todos (created_at) WHERE completed_at IS NULL
+    ''')
+    print("✅ open-row partial indexes created")
+    
+    # Create timestamp indexes for the daily dump
+    for table in ('food_logs', 'water_logs', 'gym_logs', 'reminders_todos'):
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp)')
+    print("✅ timestamp indexes created")
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_calendar_events_start
+        ON calendar_events (start_time)
+    ''')
+    print("✅ calendar_events index created")
+    
     # Commit changes and close
     conn.commit()
     conn.close()
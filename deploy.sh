@@ -20,7 +20,7 @@ echo "5. Configure:"
 echo "   - Name: alfred-the-butler"
 echo "   - Environment: Python 3"
 echo "   - Build Command: pip install -r requirements.txt"
-echo "   - Start Command: cd src && python app.py"
+echo "   - Start Command: cd src && gunicorn app:app"
 echo "   - Plan: Free"
 
 echo ""
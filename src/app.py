@@ -1,36 +1,148 @@
 import os
 import sys
 import json
+import logging
+import logging.handlers
 import atexit
+import fcntl
+import hmac
+import tempfile
 import sqlite3
 import csv
+import io
+import re
+import threading
+import time
+import queue
+import functools
+import itertools
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 
+try:
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+except ImportError:
+    SQLAlchemyJobStore = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Add src directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+sys.path.append(PROJECT_ROOT)
+
+# Scheduler jobs are stored by 'app:<function>' reference; when this file runs as a
+# script, resolve those to this module instead of importing a second copy of it
+if __name__ == '__main__':
+    sys.modules.setdefault('app', sys.modules[__name__])
 
 from config import Config
-from hugging_face_nlp import create_intelligent_processor
+from hugging_face_nlp import create_intelligent_processor, DEFAULT_MUSCLE_GROUP
 from google_services import GoogleServicesManager
 from communication_service import CommunicationService
 
+# One stream handler, fed through a queue: request threads only enqueue records
+# and a listener thread does the stdout writes. Per-message detail is at DEBUG.
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+_log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+log_listener.start()
+logging.basicConfig(
+    level=getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO),
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+log = logging.getLogger(__name__)
+
 # Check if another instance is already running
+INSTANCE_LOCK_PATH = os.path.join(tempfile.gettempdir(), 'sms_assistant.lock')
+_instance_lock = None
+
 def check_single_instance():
     """Check if another instance of the app is already running"""
-    import socket
+    global _instance_lock
+    # Append mode so a failed attempt doesn't wipe the running instance's pid
+    _instance_lock = open(INSTANCE_LOCK_PATH, 'a+')
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.bind(('localhost', 5001))
-        sock.close()
-        return True
-    except OSError:
-        print("❌ Another instance is already running on port 5001")
+        # Advisory lock, released by the kernel when this process exits
+        fcntl.flock(_instance_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        _instance_lock.seek(0)
+        pid = _instance_lock.read().strip() or 'unknown'
+        print(f"❌ Another instance is already running (pid {pid}, lock held on {INSTANCE_LOCK_PATH})")
         print("   Please stop the other instance first")
         return False
+    
+    _instance_lock.truncate(0)
+    _instance_lock.write(str(os.getpid()))
+    _instance_lock.flush()
+    atexit.register(fcntl.flock, _instance_lock, fcntl.LOCK_UN)
+    return True
+
+# Tables the daily dump exports and clears: (table, csv file, headers, log emoji)
+DUMP_TABLES = [
+    ('food_logs', 'food_logs.csv',
+     ['id', 'timestamp', 'food_name', 'calories', 'protein', 'carbs', 'fat', 'restaurant', 'portion_multiplier'], '📊'),
+    ('water_logs', 'water_logs.csv',
+     ['id', 'timestamp', 'amount_ml', 'amount_oz'], '💧'),
+    ('gym_logs', 'gym_logs.csv',
+     ['id', 'timestamp', 'exercise', 'sets', 'reps', 'weight', 'notes'], '🏋️'),
+    ('reminders_todos', 'reminders_todos.csv',
+     ['id', 'timestamp', 'type', 'content', 'due_date', 'completed', 'completed_at'], '📝'),
+]
+
+DUMP_CSVS = frozenset(csv_name for _, csv_name, _, _ in DUMP_TABLES)
+
+def append_rows_to_csv(cursor, csv_path, headers, file_exists):
+    """Stream a query's rows into a CSV file (append mode), returning how many were written
+    
+    Rows go from the cursor to the file one fetchmany batch at a time, never held
+    in a full list. Each batch is rendered into a StringIO and written in one
+    call. The file isn't touched when there are no rows.
+    """
+    cursor.arraysize = 1000
+    rows = cursor.fetchmany()
+    if not rows:
+        return 0
+    
+    count = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # Only write headers if file is new
+    if not file_exists:
+        writer.writerow(headers)
+    with open(csv_path, 'a', newline='', encoding='utf-8') as csvfile:
+        while rows:
+            writer.writerows(rows)
+            count += len(rows)
+            csvfile.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+            rows = cursor.fetchmany()
+    return count
+
+def export_table(spec, yesterday, today, existing_files):
+    """Append one table's rows from yesterday to its CSV on a private read-only connection"""
+    table, csv_name, headers, label = spec
+    conn = sqlite3.connect(f'file:{config.DATABASE_PATH}?mode=ro', uri=True)
+    try:
+        # Plain ranges on timestamp (not DATE(timestamp)) so the timestamp indexes apply
+        cursor = conn.execute(f'SELECT * FROM {table} WHERE timestamp >= ? AND timestamp < ?', (yesterday, today))
+        csv_path = os.path.join(DATA_DIR, csv_name)
+        count = append_rows_to_csv(cursor, csv_path, headers, csv_name in existing_files)
+    finally:
+        conn.close()
+    if count:
+        print(f"{label} Appended {count} {table.replace('_', ' ')} to {csv_path}")
 
 def daily_database_dump():
     """Export all database data to CSV files and clean the database for the next day"""
@@ -38,90 +150,29 @@ def daily_database_dump():
         print("🔄 Starting daily database dump at 5 AM...")
         
         # Create data directory if it doesn't exist
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        
-        # Get today's date for filename
-        today = datetime.now().strftime('%Y-%m-%d')
-        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # 1. Export food logs to CSV (append mode)
-        cursor.execute('SELECT * FROM food_logs WHERE DATE(timestamp) = ?', (yesterday,))
-        food_logs = cursor.fetchall()
-        
-        if food_logs:
-            food_csv_path = os.path.join(data_dir, 'food_logs.csv')
-            file_exists = os.path.exists(food_csv_path)
+        os.makedirs(DATA_DIR, exist_ok=True)
+        
+        # Day boundaries from a single clock read, so both always describe the same day
+        today_date = datetime.now().date()
+        today = today_date.isoformat()
+        yesterday = (today_date - timedelta(days=1)).isoformat()
+        
+        existing_files = set(os.listdir(DATA_DIR))
+        
+        # Export and clean up in one transaction: a single commit, and no row can
+        # land between the export and the DELETE that would remove it
+        with db_transaction() as db:
+            # BEGIN IMMEDIATE holds the write lock, so the WAL readers below all see
+            # exactly the rows the DELETEs will remove. Tables and CSVs are
+            # independent, so the exports run side by side.
+            with ThreadPoolExecutor(max_workers=len(DUMP_TABLES), thread_name_prefix='dump') as pool:
+                list(pool.map(export_table, DUMP_TABLES, itertools.repeat(yesterday),
+                              itertools.repeat(today), itertools.repeat(existing_files)))
             
-            with open(food_csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                # Only write headers if file is new
-                if not file_exists:
-                    writer.writerow(['id', 'timestamp', 'food_name', 'calories', 'protein', 'carbs', 'fat', 'restaurant', 'portion_multiplier'])
-                writer.writerows(food_logs)
-            print(f"📊 Appended {len(food_logs)} food logs to {food_csv_path}")
-        
-        # 2. Export water logs to CSV (append mode)
-        cursor.execute('SELECT * FROM water_logs WHERE DATE(timestamp) = ?', (yesterday,))
-        water_logs = cursor.fetchall()
-        
-        if water_logs:
-            water_csv_path = os.path.join(data_dir, 'water_logs.csv')
-            file_exists = os.path.exists(water_csv_path)
+            for table, _, _, _ in DUMP_TABLES:
+                db.execute(f'DELETE FROM {table} WHERE timestamp < ?', (today,))
             
-            with open(water_csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                # Only write headers if file is new
-                if not file_exists:
-                    writer.writerow(['id', 'timestamp', 'amount_ml', 'amount_oz'])
-                writer.writerows(water_logs)
-            print(f"💧 Appended {len(water_logs)} water logs to {water_csv_path}")
-        
-        # 3. Export gym logs to CSV (append mode)
-        cursor.execute('SELECT * FROM gym_logs WHERE DATE(timestamp) = ?', (yesterday,))
-        gym_logs = cursor.fetchall()
-        
-        if gym_logs:
-            gym_csv_path = os.path.join(data_dir, 'gym_logs.csv')
-            file_exists = os.path.exists(gym_csv_path)
-            
-            with open(gym_csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                # Only write headers if file is new
-                if not file_exists:
-                    writer.writerow(['id', 'timestamp', 'exercise', 'sets', 'reps', 'weight', 'notes'])
-                writer.writerows(gym_logs)
-            print(f"🏋️ Appended {len(gym_logs)} gym logs to {gym_csv_path}")
-        
-        # 4. Export reminders/todos to CSV (append mode)
-        cursor.execute('SELECT * FROM reminders_todos WHERE DATE(timestamp) = ?', (yesterday,))
-        reminder_logs = cursor.fetchall()
-        
-        if reminder_logs:
-            reminder_csv_path = os.path.join(data_dir, 'reminders_todos.csv')
-            file_exists = os.path.exists(reminder_csv_path)
-            
-            with open(reminder_csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                # Only write headers if file is new
-                if not file_exists:
-                    writer.writerow(['id', 'timestamp', 'type', 'content', 'due_date', 'completed', 'completed_at'])
-                writer.writerows(reminder_logs)
-            print(f"📝 Appended {len(reminder_logs)} reminders/todos to {reminder_csv_path}")
-        
-        # 5. Clean the database for the new day
-        cursor.execute('DELETE FROM food_logs WHERE DATE(timestamp) < ?', (today,))
-        cursor.execute('DELETE FROM water_logs WHERE DATE(timestamp) < ?', (today,))
-        cursor.execute('DELETE FROM gym_logs WHERE DATE(timestamp) < ?', (today,))
-        cursor.execute('DELETE FROM reminders_todos WHERE DATE(timestamp) < ?', (today,))
-        
-        # Keep calendar events cache (don't delete these)
-        
-        conn.commit()
-        conn.close()
+            # Keep calendar events cache (don't delete these)
         
         print(f"✅ Daily database dump completed! Database cleaned for {today}")
         
@@ -129,8 +180,19 @@ def daily_database_dump():
         print(f"❌ Error during daily database dump: {e}")
 
 # Initialize Flask app
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for webhook parsing and jsonify"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
 app.config.from_object(Config)
+if orjson:
+    app.json = OrjsonProvider(app)
 
 # Initialize services
 try:
@@ -171,7 +233,7 @@ def ensure_directories():
         print(f"✅ Database directory ensured: {db_dir}")
         
         # Create data directory
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+        data_dir = DATA_DIR
         print(f"🔍 Data directory path: {data_dir}")
         os.makedirs(data_dir, exist_ok=True)
         print(f"✅ Data directory ensured: {data_dir}")
@@ -195,7 +257,7 @@ def ensure_directories():
         # List contents of key directories
         print(f"\n📁 Contents of project root:")
         try:
-            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            project_root = PROJECT_ROOT
             if os.path.exists(project_root):
                 for item in os.listdir(project_root):
                     item_path = os.path.join(project_root, item)
@@ -247,48 +309,386 @@ def ensure_directories():
 # Create directories before initializing services
 ensure_directories()
 
+# Shared SQLite connection
+SQLITE_STATEMENT_CACHE = 256  # Room for every SQL_* constant plus the per-length Gmail ID lookups
+
+def tune_connection(conn):
+    """Apply the per-connection PRAGMAs (journal_mode=WAL is stored in the database file)"""
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-64000')
+    conn.execute('PRAGMA mmap_size=268435456')
+    return conn
+
+def open_db():
+    """Open the long-lived SQLite connection used by all handlers"""
+    conn = sqlite3.connect(config.DATABASE_PATH, check_same_thread=False, isolation_level=None,
+                           cached_statements=SQLITE_STATEMENT_CACHE)
+    
+    # WAL + synchronous=NORMAL: commits append to the log without an fsync each
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return tune_connection(conn)
+
+DB = open_db()
+DB_LOCK = threading.Lock()  # Serializes access from Flask and scheduler threads
+
+@contextmanager
+def db_transaction():
+    """Run a group of writes on the shared connection as one transaction"""
+    with DB_LOCK:
+        DB.execute('BEGIN IMMEDIATE')
+        try:
+            yield DB
+            DB.execute('COMMIT')
+        except Exception:
+            # Also covers a failed COMMIT, so the connection never stays mid-transaction
+            if DB.in_transaction:
+                DB.execute('ROLLBACK')
+            raise
+
+class DBWriter(threading.Thread):
+    """Background thread that applies queued writes to the shared connection
+    
+    Writes arriving within BATCH_WINDOW of each other are committed together,
+    so a burst of webhook and scheduler writes costs one transaction instead
+    of one each.
+    """
+    
+    BATCH_WINDOW = 0.05  # Seconds to keep collecting after the first queued write
+    MAX_BATCH = 500
+    RESULT_TIMEOUT = 10  # Seconds callers wait on a write's Future before giving up
+    
+    def __init__(self):
+        super().__init__(name='db-writer', daemon=True)
+        self.queue = queue.Queue()
+    
+    def write(self, sql, params=(), many=False):
+        """Queue a write; the returned Future resolves to the cursor's lastrowid"""
+        future = Future()
+        self.queue.put((sql, params, many, future))
+        return future
+    
+    def stop(self):
+        """Flush pending writes and stop the thread"""
+        self.queue.put(None)
+        self.join(timeout=5)
+    
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.BATCH_WINDOW
+            while batch[-1] is not None and len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            
+            stopping = None in batch
+            writes = [item for item in batch if item is not None]
+            try:
+                self._write_batch(writes)
+            except Exception as e:
+                # BEGIN/COMMIT failed (e.g. "database is locked"): nothing in the
+                # batch was written, so fail every future that isn't resolved yet
+                log.exception("❌ Database batch failed")
+                for _, _, _, future in writes:
+                    if not future.done():
+                        future.set_exception(e)
+            if stopping:
+                return
+    
+    def _write_batch(self, batch):
+        results = []
+        with db_transaction() as db:
+            for sql, params, many, future in batch:
+                # A savepoint per write: a failure (even halfway through an
+                # executemany) undoes only that write, the rest still commit.
+                # Any exception counts, e.g. OverflowError binding an int >= 2**63.
+                db.execute('SAVEPOINT queued_write')
+                try:
+                    cursor = db.executemany(sql, params) if many else db.execute(sql, params)
+                    results.append((future, cursor.lastrowid, None))
+                except Exception as e:
+                    db.execute('ROLLBACK TO queued_write')
+                    log.error("❌ Database write failed: %s", e)
+                    results.append((future, None, e))
+                db.execute('RELEASE queued_write')
+        
+        # Only resolve once the transaction has committed
+        for future, row_id, error in results:
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(row_id)
+
+db_writer = DBWriter()
+db_writer.start()
+
+# Read-only connections, one per thread - WAL lets them read while the writer commits
+_read_local = threading.local()
+
+def read_db():
+    """Get this thread's read-only connection"""
+    conn = getattr(_read_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(f'file:{config.DATABASE_PATH}?mode=ro', uri=True, isolation_level=None,
+                               cached_statements=SQLITE_STATEMENT_CACHE)
+        _read_local.conn = tune_connection(conn)
+    return conn
+
+# Row counts for /health?verbose=1, one statement instead of five
+SQL_TABLE_COUNTS = '''
+    SELECT (SELECT COUNT(*) FROM food_logs),
+           (SELECT COUNT(*) FROM water_logs),
+           (SELECT COUNT(*) FROM gym_logs),
+           (SELECT COUNT(*) FROM reminders_todos),
+           (SELECT COUNT(*) FROM calendar_events)
+'''
+
+# Writes from the message handlers, kept as constants so every call reuses one
+# prepared statement from the connection's cache
+SQL_LOG_WATER = '''
+    INSERT INTO water_logs (amount_ml, amount_oz) VALUES (?, ?)
+'''
+
+SQL_LOG_FOOD = '''
+    INSERT INTO food_logs (food_name, calories, protein, carbs, fat, restaurant, portion_multiplier)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+SQL_LOG_UNKNOWN_FOOD = '''
+    INSERT INTO food_logs (food_name, calories, protein, carbs, fat)
+    VALUES (?, 0, 0, 0, 0)
+'''
+
+SQL_LOG_EXERCISE = '''
+    INSERT INTO gym_logs (exercise, sets, reps, weight, notes)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+SQL_ADD_TODO = '''
+    INSERT INTO todos (text) VALUES (?)
+'''
+
+SQL_ADD_REMINDER = '''
+    INSERT INTO reminders_todos (type, content, due_date, completed)
+    VALUES (?, ?, ?, FALSE)
+'''
+
+SQL_ADD_TIMED_REMINDER = '''
+    INSERT INTO reminders (text, scheduled_time)
+    VALUES (?, ?)
+'''
+
+# Scheduler queries - kept as constants so the shared connection's
+# statement cache reuses the compiled statements across polls
+SQL_OPEN_REMINDERS = '''
+    SELECT id, due_date FROM reminders_todos 
+    WHERE type = 'reminder' 
+    AND completed = FALSE
+'''
+
+SQL_REMINDER_BY_ID = '''
+    SELECT content FROM reminders_todos 
+    WHERE id = ? 
+    AND completed = FALSE
+'''
+
+SQL_COMPLETE_REMINDER = '''
+    UPDATE reminders_todos 
+    SET completed = TRUE, completed_at = ? 
+    WHERE id = ?
+'''
+
+SQL_OPEN_TIMED_REMINDERS = '''
+    SELECT id, scheduled_time FROM reminders 
+    WHERE sent = FALSE 
+    AND completed_at IS NULL
+'''
+
+SQL_TIMED_REMINDER_BY_ID = '''
+    SELECT text FROM reminders 
+    WHERE id = ? 
+    AND sent = FALSE 
+    AND completed_at IS NULL
+'''
+
+SQL_MARK_TIMED_REMINDER_SENT = '''
+    UPDATE reminders SET sent = TRUE 
+    WHERE id = ?
+'''
+
+# Morning check-in: incomplete todos, overdue reminders and the last gym session
+# in one statement, each row tagged with its kind
+SQL_MORNING_CHECKIN = '''
+    SELECT * FROM (
+        SELECT 'todo', text, NULL FROM todos 
+        WHERE completed_at IS NULL
+        ORDER BY created_at
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'reminder', content, NULL FROM reminders_todos 
+        WHERE completed_at IS NULL 
+        AND due_date <= ?
+        ORDER BY due_date
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'gym', DATE(timestamp), notes FROM gym_logs 
+        ORDER BY timestamp DESC LIMIT 1
+    )
+'''
+
+SQL_EVENTS_FOR_DAY = '''
+    SELECT summary, start_time FROM calendar_events 
+    WHERE start_time >= ? AND start_time < ?
+    ORDER BY start_time
+'''
+
+SQL_CLEAR_CACHED_EVENTS = '''
+    DELETE FROM calendar_events 
+    WHERE start_time >= ? AND start_time < ?
+'''
+
+SQL_CACHE_EVENT = '''
+    INSERT OR REPLACE INTO calendar_events 
+    (google_event_id, summary, start_time, end_time, location, description)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+SQL_CLAIM_MESSAGE = '''
+    INSERT INTO processed_messages (message_id) VALUES (?)
+    ON CONFLICT (message_id) DO NOTHING
+'''
+
+SQL_CACHE_MESSAGE = '''
+    INSERT OR IGNORE INTO message_cache (message_id, body, timestamp) VALUES (?, ?, ?)
+'''
+
+SQL_PRUNE_MESSAGE_CACHE = '''
+    DELETE FROM message_cache WHERE fetched_at < datetime('now', '-7 days')
+'''
+
+SQL_GET_SYNC_STATE = '''
+    SELECT value FROM sync_state WHERE key = ?
+'''
+
+SQL_INIT_SYNC_STATE = '''
+    INSERT OR IGNORE INTO sync_state (key, value) VALUES (?, ?)
+'''
+
+# Gmail historyIds only move forward, so never overwrite a newer one
+SQL_ADVANCE_HISTORY_ID = '''
+    INSERT INTO sync_state (key, value) VALUES ('gmail_history_id', ?)
+    ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+    WHERE CAST(excluded.value AS INTEGER) > CAST(sync_state.value AS INTEGER)
+'''
+
+SQL_COMPLETE_RECENT_TODO = '''
+    UPDATE todos SET completed_at = CURRENT_TIMESTAMP 
+    WHERE id = (SELECT id FROM todos WHERE completed_at IS NULL 
+                ORDER BY created_at DESC LIMIT 1)
+'''
+
+SQL_COMPLETE_RECENT_REMINDER_TODO = '''
+    UPDATE reminders_todos SET completed_at = CURRENT_TIMESTAMP 
+    WHERE id = (SELECT id FROM reminders_todos WHERE completed_at IS NULL 
+                ORDER BY timestamp DESC LIMIT 1)
+'''
+
+SQLITE_MAX_PARAMS = 999  # Default SQLITE_MAX_VARIABLE_NUMBER on older builds
+
+CALENDAR_SYNC_DAYS = 7  # How far ahead sync_calendar_events caches events
+CALENDAR_FETCH_TTL = 300  # Seconds to reuse a live fetch for a day outside the synced window
+
+FALLBACK_RESPONSE = (
+    "🤔 I didn't understand that. Try:\n"
+    "• 'drank a bottle' (water)\n"
+    "• 'ate [food]' (food logging)\n"
+    "• 'remind me to [task]' (reminders)\n"
+    "• 'todo [task]' (todos)\n"
+    "• 'meeting with John tomorrow 2pm' (calendar)\n"
+    "• 'save receipt' (image upload)"
+)
+
+COMPLETION_PATTERN = re.compile(r'\b(did|done|finished|completed|called|went)\b', re.IGNORECASE)
+
 # Initialize Google services
 # google_services = GoogleServicesManager() # This line is now redundant as it's initialized above
 
-def check_reminders():
-    """Check for due reminders and send push notifications"""
+def send_reminder(reminder_id):
+    """Send a single reminder when its DateTrigger job fires"""
     try:
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Get all due reminders that haven't been sent
-        current_time = datetime.now()
-        cursor.execute('''
-            SELECT id, content, due_date FROM reminders_todos 
-            WHERE type = 'reminder' 
-            AND completed = FALSE 
-            AND due_date <= ?
-        ''', (current_time,))
-        
-        due_reminders = cursor.fetchall()
-        
-        for reminder_id, content, due_date in due_reminders:
-            # Send reminder via communication service
-            message = f"⏰ REMINDER: {content}"
-            result = communication_service.send_response(message)
-            
-            if result['success']:
-                print(f"🔔 Reminder sent via {result['method']}: {content}")
-                
-                # Mark as completed
-                cursor.execute('''
-                    UPDATE reminders_todos 
-                    SET completed = TRUE, completed_at = ? 
-                    WHERE id = ?
-                ''', (current_time, reminder_id))
-            else:
-                print(f"❌ Failed to send reminder: {result.get('error', 'Unknown error')}")
+        row = read_db().execute(SQL_REMINDER_BY_ID, (reminder_id,)).fetchone()
         
-        conn.commit()
-        conn.close()
+        # Already sent, or completed by the user
+        if not row:
+            return
+        
+        message = f"⏰ REMINDER: {row[0]}"
+        result = communication_service.send_response(message)
+        
+        if result['success']:
+            print(f"🔔 Reminder sent via {result['method']}: {row[0]}")
+            db_writer.write(SQL_COMPLETE_REMINDER, (datetime.now(), reminder_id))
+        else:
+            print(f"❌ Failed to send reminder: {result.get('error', 'Unknown error')}")
+        
+    except Exception as e:
+        print(f"❌ Error sending reminder {reminder_id}: {e}")
+
+def schedule_reminder_job(reminder_id, due_date):
+    """Register a one-shot scheduler job that fires exactly when the reminder is due"""
+    scheduler.add_job(
+        func='app:send_reminder',
+        trigger='date',
+        run_date=due_date,
+        args=[reminder_id],
+        id=f'reminder_{reminder_id}',
+        name='Reminder',
+        misfire_grace_time=None,  # Late is better than never for reminders
+        replace_existing=True
+    )
+
+def send_timed_reminder(reminder_id):
+    """Send a food macro reminder (reminders table) when its DateTrigger job fires"""
+    try:
+        row = read_db().execute(SQL_TIMED_REMINDER_BY_ID, (reminder_id,)).fetchone()
+        
+        # Already sent, or completed by the user
+        if not row:
+            return
         
+        send_push_notification("Reminder", f"⏰ {row[0]}")
+        db_writer.write(SQL_MARK_TIMED_REMINDER_SENT, (reminder_id,))
+        
+    except Exception as e:
+        print(f"❌ Error sending timed reminder {reminder_id}: {e}")
+
+def schedule_timed_reminder_job(reminder_id, scheduled_time):
+    """Register a one-shot scheduler job for a row in the reminders table"""
+    scheduler.add_job(
+        func='app:send_timed_reminder',
+        trigger='date',
+        run_date=scheduled_time,
+        args=[reminder_id],
+        id=f'timed_reminder_{reminder_id}',
+        name='Timed Reminder',
+        misfire_grace_time=None,
+        replace_existing=True
+    )
+
+def reschedule_pending_reminders():
+    """Register a job for every open reminder (reminders that came due while down fire right away)"""
+    try:
+        db = read_db()
+        for reminder_id, due_date in db.execute(SQL_OPEN_REMINDERS).fetchall():
+            schedule_reminder_job(reminder_id, due_date)
+        for reminder_id, scheduled_time in db.execute(SQL_OPEN_TIMED_REMINDERS).fetchall():
+            schedule_timed_reminder_job(reminder_id, scheduled_time)
     except Exception as e:
-        print(f"❌ Error checking reminders: {e}")
+        print(f"❌ Error rescheduling reminders: {e}")
 
 # Scheduler will be initialized after all functions are defined
 
@@ -297,28 +697,26 @@ def view_csv(filename):
     """View the contents of a CSV file"""
     try:
         # Validate filename to prevent directory traversal
-        allowed_files = ['food_logs.csv', 'water_logs.csv', 'gym_logs.csv', 'reminders_todos.csv']
-        if filename not in allowed_files:
+        if filename not in DUMP_CSVS:
             return jsonify({'error': 'Invalid filename'}), 400
         
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
-        csv_path = os.path.join(data_dir, filename)
+        csv_path = os.path.join(DATA_DIR, filename)
         
         if not os.path.exists(csv_path):
             return jsonify({'error': 'CSV file not found'}), 404
         
-        # Read CSV and return as JSON
-        data = []
-        with open(csv_path, 'r', encoding='utf-8') as csvfile:
+        # Read CSV and return as JSON - only the first 100 rows become dicts,
+        # the rest are just counted on the underlying reader
+        with open(csv_path, 'r', encoding='utf-8', newline='') as csvfile:
             reader = csv.DictReader(csvfile)
-            for row in reader:
-                data.append(row)
+            data = list(itertools.islice(reader, 100))  # Limit to first 100 rows for performance
+            total_rows = len(data) + sum(1 for _ in reader.reader)
         
         return jsonify({
             'filename': filename,
-            'row_count': len(data),
-            'data': data[:100],  # Limit to first 100 rows for performance
-            'total_rows': len(data)
+            'row_count': total_rows,
+            'data': data,
+            'total_rows': total_rows
         })
         
     except Exception as e:
@@ -328,21 +726,19 @@ def view_csv(filename):
 def list_csvs():
     """List all available CSV files with their sizes"""
     try:
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
-        
-        if not os.path.exists(data_dir):
+        if not os.path.exists(DATA_DIR):
             return jsonify({'csvs': []})
         
         csv_files = []
-        for filename in os.listdir(data_dir):
-            if filename.endswith('.csv'):
-                file_path = os.path.join(data_dir, filename)
-                file_size = os.path.getsize(file_path)
-                csv_files.append({
-                    'filename': filename,
-                    'size_bytes': file_size,
-                    'size_kb': round(file_size / 1024, 2)
-                })
+        with os.scandir(DATA_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith('.csv'):
+                    file_size = entry.stat().st_size
+                    csv_files.append({
+                        'filename': entry.name,
+                        'size_bytes': file_size,
+                        'size_kb': round(file_size / 1024, 2)
+                    })
         
         return jsonify({'csvs': csv_files})
         
@@ -370,83 +766,163 @@ def manual_dump():
 # Database initialization
 def init_db():
     """Initialize the database with all required tables"""
-    conn = sqlite3.connect(config.DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Create food logs table with enhanced fields
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS food_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            food_name TEXT NOT NULL,
-            calories INTEGER NOT NULL,
-            protein REAL NOT NULL,
-            carbs REAL NOT NULL,
-            fat REAL NOT NULL,
-            restaurant TEXT,
-            portion_multiplier REAL DEFAULT 1.0
-        )
-    ''')
-    
-    # Create water logs table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS water_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            amount_ml REAL NOT NULL,
-            amount_oz REAL NOT NULL
-        )
-    ''')
-    
-    # Create gym logs table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS gym_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            exercise TEXT NOT NULL,
-            sets INTEGER,
-            reps INTEGER,
-            weight REAL,
-            notes TEXT
-        )
-    ''')
-    
-    # Create reminders and todos table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS reminders_todos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            type TEXT NOT NULL,
-            content TEXT NOT NULL,
-            due_date DATETIME,
-            completed BOOLEAN DEFAULT FALSE,
-            completed_at DATETIME
-        )
-    ''')
-    
-    # Create calendar events cache table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS calendar_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            google_event_id TEXT UNIQUE NOT NULL,
-            summary TEXT NOT NULL,
-            start_time DATETIME NOT NULL,
-            end_time DATETIME,
-            location TEXT,
-            description TEXT,
-            cached_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    with db_transaction() as db:
+        # Create food logs table with enhanced fields
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS food_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                food_name TEXT NOT NULL,
+                calories INTEGER NOT NULL,
+                protein REAL NOT NULL,
+                carbs REAL NOT NULL,
+                fat REAL NOT NULL,
+                restaurant TEXT,
+                portion_multiplier REAL DEFAULT 1.0
+            )
+        ''')
+        
+        # Create water logs table
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS water_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                amount_ml REAL NOT NULL,
+                amount_oz REAL NOT NULL
+            )
+        ''')
+        
+        # Create gym logs table
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS gym_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                exercise TEXT NOT NULL,
+                sets INTEGER,
+                reps INTEGER,
+                weight REAL,
+                notes TEXT
+            )
+        ''')
+        
+        # Create reminders and todos table
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS reminders_todos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                type TEXT NOT NULL,
+                content TEXT NOT NULL,
+                due_date DATETIME,
+                completed BOOLEAN DEFAULT FALSE,
+                completed_at DATETIME
+            )
+        ''')
+        
+        # Create standalone reminders table (food macro reminders)
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS reminders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                scheduled_time DATETIME NOT NULL,
+                sent BOOLEAN DEFAULT FALSE,
+                completed_at DATETIME,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create todos table
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS todos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                completed_at DATETIME
+            )
+        ''')
+        
+        # Create calendar events cache table
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS calendar_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                google_event_id TEXT UNIQUE NOT NULL,
+                summary TEXT NOT NULL,
+                start_time DATETIME NOT NULL,
+                end_time DATETIME,
+                location TEXT,
+                description TEXT,
+                cached_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create processed messages table so redelivered Gmail pushes are skipped
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS processed_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                message_id TEXT UNIQUE NOT NULL,
+                processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create message cache table so Gmail messages aren't downloaded twice
+        # (body is NULL for messages that aren't Google Voice SMS)
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS message_cache (
+                message_id TEXT PRIMARY KEY,
+                body TEXT,
+                timestamp TEXT,
+                fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create sync state table (e.g. the last Gmail historyId seen)
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Index for serving schedule checks from the calendar cache
+        db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_calendar_events_start
+            ON calendar_events (start_time)
+        ''')
+        
+        # Indexes for the daily dump's timestamp range scans
+        for table in ('food_logs', 'water_logs', 'gym_logs', 'reminders_todos'):
+            db.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp)')
+        
+        # Indexes for the reminder checker and morning check-in predicates
+        db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_reminders_todos_due
+            ON reminders_todos (type, completed, due_date)
+        ''')
+        
+        # Partial indexes over just the open rows, which stay few as the tables grow
+        db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_reminders_todos_open_due
+            ON reminders_todos (due_date) WHERE completed_at IS NULL
+        ''')
+        db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_reminders_pending
+            ON reminders (scheduled_time) WHERE sent = FALSE AND completed_at IS NULL
+        ''')
+        db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_todos_open
+            ON todos (created_at) WHERE completed_at IS NULL
+        ''')
     
-    conn.commit()
-    conn.close()
     print("✅ Database initialized with all tables")
 
+init_db()
+
 # Load hardcoded food database
 def load_food_database():
     try:
-        with open(config.FOOD_DATABASE_PATH, 'r') as f:
-            return json.load(f)
+        with open(config.FOOD_DATABASE_PATH, 'rb') as f:
+            data = f.read()
+        return orjson.loads(data) if orjson else json.loads(data)
     except FileNotFoundError:
         # Create empty database if it doesn't exist
         return {}
@@ -455,28 +931,46 @@ FOOD_DATABASE = load_food_database()
 
 # Core message processing
 class EnhancedMessageProcessor:
-    def __init__(self):
-        # Load custom food database
-        try:
-            with open(config.FOOD_DATABASE_PATH, 'r') as f:
-                custom_food_db = json.load(f)
-                print("✅ Custom food database loaded")
-        except FileNotFoundError:
+    def __init__(self, food_db):
+        # The food database is parsed once at import and shared
+        if food_db:
+            print("✅ Custom food database loaded")
+        else:
             print("⚠️  Custom food database not found, using default")
-            custom_food_db = FOOD_DATABASE
         
-        self.nlp_processor = create_intelligent_processor(custom_food_db)
+        self.nlp_processor = create_intelligent_processor(food_db)
         self.google_services = google_services
+        
+        # Repeated SMS ("drank a bottle", "done") skip the NLP pipeline. Handlers
+        # still run every time, so logging intents keep writing to the database.
+        self._parse_cached = functools.lru_cache(maxsize=512)(self._parse_message)
+        
+        # Live Google Calendar fetches for days outside the synced window: day -> (expiry, events)
+        self._calendar_fetches = {}
+        
+        self.intent_handlers = {
+            'water_logging': self.handle_water,
+            'food_logging': self.handle_food,
+            'gym_workout': self.handle_gym,
+            'todo_add': self.handle_todo,
+            'reminder_set': self.handle_reminder,
+            'calendar_event': self.handle_calendar,
+            'schedule_check': self.handle_schedule_check,
+            'photo_upload': self.handle_image_upload
+        }
+    
+    def _parse_message(self, message_body, day):
+        """Classify intent and extract entities (cached per message text and day)"""
+        # `day` is part of the cache key because relative dates depend on today
+        return self.nlp_processor.analyze(message_body)
     
     def process_message(self, message_body):
         """Main message processing pipeline using intelligent NLP"""
         # Use intelligent NLP processor to classify intent and extract entities
-        intent = self.nlp_processor.classify_intent(message_body)
-        entities = self.nlp_processor.extract_entities(message_body)
+        intent, entities = self._parse_cached(message_body.strip(), datetime.now().date())
         
-        print(f"🧠 Intelligent NLP Results:")
-        print(f"   Intent: {intent}")
-        print(f"   Entities: {entities}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("🧠 Intelligent NLP Results: intent=%s entities=%s", intent, entities)
         
         # Process based on intent
         response = self.handle_intent(intent, message_body, entities)
@@ -487,26 +981,11 @@ class EnhancedMessageProcessor:
     
     def handle_intent(self, intent, message, entities):
         """Handle specific intent using intelligent NLP"""
-        if intent == 'water_logging':
-            return self.handle_water(message, entities)
-        elif intent == 'food_logging':
-            return self.handle_food(message, entities)
-        elif intent == 'gym_workout':
-            return self.handle_gym(message, entities)
-        elif intent == 'todo_add':
-            return self.handle_todo(message, entities)
-        elif intent == 'reminder_set':
-            return self.handle_reminder(message, entities)
-        elif intent == 'calendar_event':
-            return self.handle_calendar(message, entities)
-        elif intent == 'schedule_check':
-            return self.handle_schedule_check(message, entities)
-        elif intent == 'photo_upload':
-            return self.handle_image_upload(message, entities)
-        elif intent == 'unknown':
+        if intent == 'unknown':
             return self.fallback_response(message)
         
-        return None
+        handler = self.intent_handlers.get(intent)
+        return handler(message, entities) if handler else None
     
     def handle_water(self, message, entities):
         """Handle water logging using enhanced NLP processor"""
@@ -519,14 +998,7 @@ class EnhancedMessageProcessor:
     
     def log_water(self, amount_ml):
         """Log water intake to database"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO water_logs (amount_ml) VALUES (?)',
-            (amount_ml,)
-        )
-        conn.commit()
-        conn.close()
+        db_writer.write(SQL_LOG_WATER, (amount_ml, round(amount_ml / 29.5735, 1)))
     
     def handle_food(self, message, entities):
         """Handle food logging"""
@@ -562,43 +1034,14 @@ class EnhancedMessageProcessor:
         
         return None
     
-    def parse_food_from_entities(self, message, food_name):
-        """Parse known food with portion multiplier"""
-        # Find matching food in database
-        for food_key, food_data in self.food_db.items():
-            if food_data['display_name'].lower() == food_name.lower():
-                # Handle portions using enhanced NLP processor
-                multiplier = self.nlp_processor.parse_portion_multiplier(message)
-                return {
-                    'name': food_data['display_name'],
-                    'calories': int(food_data['calories'] * multiplier),
-                    'protein': round(food_data['protein'] * multiplier, 1),
-                    'carbs': round(food_data['carbs'] * multiplier, 1),
-                    'fat': round(food_data['fat'] * multiplier, 1)
-                }
-        return None
-    
     def log_food(self, food_name, calories, protein, carbs, fat, restaurant=None, portion_multiplier=1.0):
         """Log food to database"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO food_logs (food_name, calories, protein, carbs, fat, restaurant, portion_multiplier)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (food_name, calories, protein, carbs, fat, restaurant, portion_multiplier))
-        conn.commit()
-        conn.close()
+        db_writer.write(SQL_LOG_FOOD, (food_name, calories, protein, carbs, fat, restaurant, portion_multiplier))
     
     def log_unknown_food(self, food_name):
         """Log unknown food"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO food_logs (food_name, calories, protein, carbs, fat, notes)
-            VALUES (?, 0, 0, 0, 0, 'UNKNOWN - needs macros')
-        ''', (food_name,))
-        conn.commit()
-        conn.close()
+        # food_logs has no notes column; zero macros mark it as needing macros
+        db_writer.write(SQL_LOG_UNKNOWN_FOOD, (food_name,))
     
     def schedule_food_reminder(self, food_name):
         """Schedule evening reminder to add food to database"""
@@ -606,18 +1049,16 @@ class EnhancedMessageProcessor:
         if reminder_time <= datetime.now():
             reminder_time += timedelta(days=1)
         
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO reminders (text, scheduled_time)
-            VALUES (?, ?)
-        ''', (f"Add macros for '{food_name}' to food database", reminder_time))
-        conn.commit()
-        conn.close()
+        # Wait for the row id, then fire at reminder_time instead of being polled for
+        reminder_id = db_writer.write(
+            SQL_ADD_TIMED_REMINDER, (f"Add macros for '{food_name}' to food database", reminder_time)
+        ).result(timeout=DBWriter.RESULT_TIMEOUT)
+        
+        schedule_timed_reminder_job(reminder_id, reminder_time)
     
     def handle_gym(self, message, entities):
         """Handle gym workout logging using enhanced NLP processor"""
-        workout_data = self.nlp_processor.parse_gym_workout(message)
+        workout_data = self.nlp_processor.parse_gym_workout(message, entities)
         if workout_data:
             self.log_gym_workout(workout_data)
             
@@ -633,42 +1074,46 @@ class EnhancedMessageProcessor:
                     detail = f"{ex['name']} {ex['weight']}"
                 exercise_details.append(detail)
             
-            response = f"💪 Logged {workout_data['muscle_group']} workout: {', '.join(exercise_details)}"
+            muscle_group = workout_data.get('muscle_group') or DEFAULT_MUSCLE_GROUP
+            response = f"💪 Logged {muscle_group} workout: {', '.join(exercise_details)}"
             return response
         
         return None
     
     def log_gym_workout(self, workout_data):
-        """Log gym workout to database"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO gym_logs (date, muscle_groups, exercises)
-            VALUES (?, ?, ?)
-        ''', (datetime.now().date(), workout_data['muscle_group'], json.dumps(workout_data['exercises'])))
-        conn.commit()
-        conn.close()
+        """Log gym workout to database, one row per exercise"""
+        # The muscle group goes in notes so the morning check-in can report it
+        muscle_group = workout_data.get('muscle_group') or DEFAULT_MUSCLE_GROUP
+        db_writer.write(SQL_LOG_EXERCISE, [
+            (ex['name'], ex['sets'], ex['reps'], ex['weight'], muscle_group)
+            for ex in workout_data['exercises']
+        ], many=True)
     
     def handle_todo(self, message, entities):
         """Handle todo creation using enhanced NLP processor"""
-        tasks = entities.get('tasks', [])
-        if tasks:
-            task = tasks[0]
-            self.add_todo(task)
-            return f"✅ Added to todo list: {task}"
-        return None
+        tasks = self.nlp_processor.parse_todo(message)
+        if not tasks:
+            return None
+        if len(tasks) == 1:
+            self.add_todo(tasks[0])
+        else:
+            self.add_todos(tasks)
+        return f"✅ Added to todo list: {', '.join(tasks)}"
     
     def add_todo(self, task):
         """Add todo to database"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO todos (text) VALUES (?)', (task,))
-        conn.commit()
-        conn.close()
+        db_writer.write(SQL_ADD_TODO, (task,))
+    
+    def add_todos(self, tasks):
+        """Add several todos, one multi-row INSERT per chunk of SQLITE_MAX_PARAMS"""
+        for start in range(0, len(tasks), SQLITE_MAX_PARAMS):
+            chunk = tasks[start:start + SQLITE_MAX_PARAMS]
+            values = ','.join(['(?)'] * len(chunk))
+            db_writer.write(f'INSERT INTO todos (text) VALUES {values}', chunk)
     
     def handle_reminder(self, message, entities):
         """Handle reminder creation using enhanced NLP processor"""
-        reminder_data = self.nlp_processor.parse_reminder(message)
+        reminder_data = self.nlp_processor.parse_reminder(message, entities)
         if reminder_data:
             # Store reminder in database
             self.schedule_reminder(reminder_data)
@@ -685,19 +1130,17 @@ class EnhancedMessageProcessor:
         return None
     
     def schedule_reminder(self, reminder_data):
-        """Schedule reminder to database"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO reminders_todos (type, content, due_date, completed)
-            VALUES (?, ?, ?, FALSE)
-        ''', ('reminder', reminder_data['content'], reminder_data['due_date']))
-        conn.commit()
-        conn.close()
+        """Schedule reminder to database and register a one-shot job for its due time"""
+        # Wait for the write so the job can be keyed on the new row id
+        reminder_id = db_writer.write(
+            SQL_ADD_REMINDER, ('reminder', reminder_data['content'], reminder_data['due_date'])
+        ).result(timeout=DBWriter.RESULT_TIMEOUT)
+        
+        schedule_reminder_job(reminder_id, reminder_data['due_date'])
     
     def handle_calendar(self, message, entities):
         """Handle calendar event creation using enhanced NLP processor"""
-        event_data = self.nlp_processor.parse_calendar_event(message)
+        event_data = self.nlp_processor.parse_calendar_event(message, entities)
         if event_data:
             # Create calendar event via Google services
             event_id = self.google_services.create_calendar_event(
@@ -722,12 +1165,9 @@ class EnhancedMessageProcessor:
     
     def handle_schedule_check(self, message, entities):
         """Handle schedule checking queries"""
-        schedule_query = self.nlp_processor.parse_schedule_query(message)
+        schedule_query = self.nlp_processor.parse_schedule_query(message, entities)
         if schedule_query:
-            # Get schedule from Google Calendar
-            events = self.google_services.get_calendar_events(
-                start_date=schedule_query['date']
-            )
+            events = self.get_events_for_day(schedule_query['date'])
             
             if events:
                 response = f"📅 Schedule for {schedule_query['date'].strftime('%B %d')}:\n"
@@ -759,7 +1199,7 @@ class EnhancedMessageProcessor:
     
     def handle_image_upload(self, message, entities):
         """Handle photo upload requests"""
-        photo_data = self.nlp_processor.parse_photo_upload(message)
+        photo_data = self.nlp_processor.parse_photo_upload(message, entities)
         if photo_data:
             # For now, acknowledge the request
             # TODO: Implement actual photo upload when image is attached
@@ -785,24 +1225,38 @@ class EnhancedMessageProcessor:
     
     def cache_calendar_event(self, google_event_id, event_info):
         """Cache calendar event in database"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO calendar_events 
-            (google_event_id, summary, start_time, end_time, location, description)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (google_event_id, event_info['summary'], event_info['start_time'],
-              event_info['end_time'], event_info['location'], event_info['description']))
-        conn.commit()
-        conn.close()
+        db_writer.write(SQL_CACHE_EVENT, (
+            google_event_id, event_info['summary'], event_info['start_time'],
+            event_info['end_time'], event_info['location'], event_info['description']
+        ))
+    
+    def get_events_for_day(self, date):
+        """Get a day's events from the local cache, or Google Calendar if the day isn't synced"""
+        day = date.strftime('%Y-%m-%d')
+        next_day = (date + timedelta(days=1)).strftime('%Y-%m-%d')
+        
+        sync_end = (datetime.now() + timedelta(days=CALENDAR_SYNC_DAYS)).strftime('%Y-%m-%d')
+        if datetime.now().strftime('%Y-%m-%d') <= day < sync_end:
+            rows = read_db().execute(SQL_EVENTS_FOR_DAY, (day, next_day)).fetchall()
+            return [{'summary': summary, 'start': start} for summary, start in rows]
+        
+        # Repeat questions about the same far-off day reuse a recent fetch
+        cached = self._calendar_fetches.get(day)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        events = self.google_services.get_calendar_events(start_date=date)
+        if events is None:
+            # Don't cache a failed fetch; the next question retries it
+            return []
+        if len(self._calendar_fetches) >= 32:
+            self._calendar_fetches.clear()
+        self._calendar_fetches[day] = (time.monotonic() + CALENDAR_FETCH_TTL, events)
+        return events
     
     def handle_completion(self, message, entities):
         """Handle task/reminder completions"""
-        completion_patterns = [
-            'did', 'done', 'finished', 'completed', 'called', 'went'
-        ]
-        
-        if any(pattern in message for pattern in completion_patterns):
+        if COMPLETION_PATTERN.search(message):
             # Try to match and complete tasks/reminders
             self.mark_recent_task_complete(message)
             return "✅ Task marked as complete!"
@@ -810,138 +1264,196 @@ class EnhancedMessageProcessor:
     
     def mark_recent_task_complete(self, message):
         """Mark recent task as complete based on message content"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
         # Simple approach: mark the most recent incomplete todo as complete
-        cursor.execute('''
-            UPDATE todos SET completed_at = CURRENT_TIMESTAMP 
-            WHERE completed_at IS NULL 
-            ORDER BY created_at DESC LIMIT 1
-        ''')
-        
-        cursor.execute('''
-            UPDATE reminders_todos SET completed_at = CURRENT_TIMESTAMP 
-            WHERE completed_at IS NULL 
-            ORDER BY timestamp DESC LIMIT 1
-        ''')
-        
-        conn.commit()
-        conn.close()
+        # UPDATE ... LIMIT needs a compile-time SQLite option, so pick the row in a subquery.
+        # Both UPDATEs share one BEGIN IMMEDIATE transaction: one lock, one commit.
+        with db_transaction() as db:
+            db.execute(SQL_COMPLETE_RECENT_TODO)
+            db.execute(SQL_COMPLETE_RECENT_REMINDER_TODO)
     
     def fallback_response(self, message):
         """Fallback response for unrecognized messages"""
-        return "🤔 I didn't understand that. Try:\n• 'drank a bottle' (water)\n• 'ate [food]' (food logging)\n• 'remind me to [task]' (reminders)\n• 'todo [task]' (todos)\n• 'meeting with John tomorrow 2pm' (calendar)\n• 'save receipt' (image upload)"
+        return FALLBACK_RESPONSE
+
+# Shared processor - the NLP models and food database are loaded once, not per message
+message_processor = EnhancedMessageProcessor(FOOD_DATABASE)
+
+# Runs NLP, database writes and replies off the request thread for webhooks that need a fast ack
+webhook_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='webhook')
+
+# Gmail pushes run one at a time, so the next one diffs from the historyId this one
+# stored instead of listing the same history concurrently; a push waiting its turn
+# queues here rather than holding a webhook_executor thread
+gmail_push_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gmail-push')
+
+def send_sms_response(response_text, to_number):
+    """Send a reply through the communication service and log the outcome"""
+    try:
+        result = communication_service.send_response(response_text, to_number)
+        
+        log.debug("📤 Communication service result: %s", result)
+        
+        if result['success']:
+            log.info("✅ Response sent via %s", result['method'])
+        else:
+            log.error("❌ Failed to send response: %s", result.get('error', 'Unknown error'))
+    except Exception:
+        log.exception("❌ Error sending response")
 
 # Routes
 @app.route('/webhook/signalwire', methods=['POST'])
 def signalwire_webhook():
     """Handle incoming SMS from SignalWire"""
     try:
-        print(f"\n📱 === SIGNALWIRE WEBHOOK RECEIVED ===")
-        print(f"📱 Request method: {request.method}")
-        print(f"📱 Request headers: {dict(request.headers)}")
-        print(f"📱 Request content type: {request.content_type}")
+        log.info("📱 SignalWire webhook received")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("📱 %s %s headers=%s body=%r", request.method, request.content_type,
+                      dict(request.headers), request.get_data())
         
-        # Get raw data
-        raw_data = request.get_data()
-        print(f"📱 Raw request data: {raw_data}")
-        
-        # Try to parse JSON
-        try:
-            data = request.get_json()
-            print(f"📱 Parsed JSON data: {data}")
-        except Exception as json_error:
-            print(f"❌ JSON parsing failed: {json_error}")
-            # Try form data instead
-            form_data = request.form.to_dict()
-            print(f"📱 Form data: {form_data}")
-            data = form_data
+        # JSON goes through the app's (orjson) provider; SignalWire may also post a form
+        data = request.get_json(silent=True)
+        if data is None:
+            data = request.form.to_dict()
+        message_id = None
         
         # Extract SMS data from SignalWire webhook
         if data:
-            print(f"📱 Processing data: {data}")
-            
             # Try different possible field names
             from_number = data.get('from_number') or data.get('From') or data.get('from')
             to_number = data.get('to_number') or data.get('To') or data.get('to')
             message_body = data.get('body') or data.get('Body') or data.get('message') or data.get('text')
             message_id = data.get('id') or data.get('MessageSid')
             
-            print(f"📱 Extracted data:")
-            print(f"   From: {from_number}")
-            print(f"   To: {to_number}")
-            print(f"   Body: {message_body}")
-            print(f"   ID: {message_id}")
+            log.debug("📱 Extracted data: from=%s to=%s id=%s body=%s",
+                      from_number, to_number, message_id, message_body)
             
             if message_body and from_number:
-                print(f"✅ Valid SMS data received, processing message...")
-                
                 # Process the message
-                processor = EnhancedMessageProcessor()
-                response_text = processor.process_message(message_body)
+                response_text = message_processor.process_message(message_body)
                 
-                print(f"🧠 NLP processing complete:")
-                print(f"   Response: {response_text}")
+                log.debug("🧠 NLP processing complete, response: %s", response_text)
                 
-                # Send response back via SignalWire
+                # Send response back via SignalWire, off the request thread so the
+                # outbound REST call doesn't delay the 200 (slow acks get retried)
                 if response_text:
-                    print(f"📤 Sending response via communication service...")
-                    result = communication_service.send_response(response_text, from_number)
-                    
-                    print(f"📤 Communication service result: {result}")
-                    
-                    if result['success']:
-                        print(f"✅ Response sent via {result['method']}: {response_text}")
-                    else:
-                        print(f"❌ Failed to send response: {result.get('error', 'Unknown error')}")
+                    webhook_executor.submit(send_sms_response, response_text, from_number)
                 else:
-                    print(f"⚠️  No response generated for message")
+                    log.warning("⚠️  No response generated for message")
             else:
-                print(f"❌ Missing required SMS data (body or from_number)")
-                print(f"   Available fields: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
+                log.warning("❌ Missing required SMS data (body or from_number), fields: %s",
+                            list(data.keys()) if isinstance(data, dict) else 'Not a dict')
         else:
-            print(f"❌ No data received in webhook")
+            log.warning("❌ No data received in webhook")
         
-        print(f"📱 === WEBHOOK PROCESSING COMPLETE ===\n")
-        
-        return jsonify({'status': 'success', 'message_id': message_id if 'message_id' in locals() else None}), 200
+        return jsonify({'status': 'success', 'message_id': message_id}), 200
             
     except Exception as e:
-        print(f"❌ Error processing SignalWire webhook: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ Error processing SignalWire webhook")
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
-@app.route('/webhook/gmail', methods=['POST'])
-def gmail_webhook():
-    """Handle incoming Gmail webhook (Google Voice SMS forwarded to Gmail)"""
+def get_gmail_sms(message_ids):
+    """Get the Google Voice SMS among message_ids, downloading only messages not in message_cache
+    
+    Returns (sms, unfetched): the SMS dicts in message_ids order, and the IDs that
+    couldn't be downloaded (so the caller knows not to move past them).
+    """
+    cached = {}
+    db = read_db()
+    for start in range(0, len(message_ids), SQLITE_MAX_PARAMS):
+        chunk = message_ids[start:start + SQLITE_MAX_PARAMS]
+        placeholders = ','.join('?' * len(chunk))
+        rows = db.execute(
+            f'SELECT message_id, body, timestamp FROM message_cache WHERE message_id IN ({placeholders})',
+            chunk
+        ).fetchall()
+        for message_id, body, timestamp in rows:
+            cached[message_id] = {'message_id': message_id, 'body': body, 'timestamp': timestamp} if body else None
+    
+    missing = [message_id for message_id in message_ids if message_id not in cached]
+    if missing:
+        fetched = google_services.fetch_voice_sms(missing)
+        if fetched:
+            db_writer.write(SQL_CACHE_MESSAGE, [
+                (message_id, sms['body'] if sms else None, sms['timestamp'] if sms else None)
+                for message_id, sms in fetched.items()
+            ], many=True)
+        cached.update(fetched)
+    
+    unfetched = [message_id for message_id in missing if message_id not in cached]
+    return [cached[message_id] for message_id in message_ids if cached.get(message_id)], unfetched
+
+def prune_message_cache():
+    """Drop cached Gmail messages older than a week"""
     try:
-        # Verify webhook secret
-        webhook_secret = request.headers.get('X-Webhook-Secret')
-        if webhook_secret != config.GMAIL_WEBHOOK_SECRET:
-            return '', 403
-        
-        # Process webhook data
-        webhook_data = request.get_json()
-        if not webhook_data:
-            return '', 400
-        
-        # Process Gmail message
-        message_data = google_services.process_gmail_webhook(webhook_data)
-        if not message_data:
-            return '', 200  # Not a relevant message
-        
-        print(f"=== INCOMING SMS VIA GMAIL ===")
-        print(f"Message: '{message_data['body']}'")
-        print(f"Timestamp: {message_data['timestamp']}")
-        print("===============================")
+        db_writer.write(SQL_PRUNE_MESSAGE_CACHE)
+    except Exception as e:
+        print(f"Error pruning message cache: {e}")
+
+def unprocessed_message_ids(message_ids):
+    """Drop the Gmail message IDs already recorded in processed_messages"""
+    seen = set()
+    db = read_db()
+    # Stay under SQLite's bound-parameter limit
+    for start in range(0, len(message_ids), SQLITE_MAX_PARAMS):
+        chunk = message_ids[start:start + SQLITE_MAX_PARAMS]
+        placeholders = ','.join('?' * len(chunk))
+        rows = db.execute(
+            f'SELECT message_id FROM processed_messages WHERE message_id IN ({placeholders})',
+            chunk
+        ).fetchall()
+        seen.update(row[0] for row in rows)
+    return [message_id for message_id in message_ids if message_id not in seen]
+
+def handle_gmail_push(webhook_data):
+    """Fetch the SMS behind a Gmail push and hand them to webhook_executor (runs on gmail_push_executor)"""
+    try:
+        row = read_db().execute(SQL_GET_SYNC_STATE, ('gmail_history_id',)).fetchone()
+        # Raises if Gmail can't be listed; the historyId then stays put for the next push
+        result = google_services.process_gmail_webhook(webhook_data, row[0] if row else None)
+        
+        # Most pushes add nothing we care about (labels, reads, other mail):
+        # just record the new historyId without any lookups or a write lock
+        if not result['message_ids']:
+            if result['history_id']:
+                db_writer.write(SQL_ADVANCE_HISTORY_ID, (result['history_id'],))
+            return
+        
+        # Only spend Gmail quota on messages we haven't handled yet
+        message_ids = unprocessed_message_ids(result['message_ids'])
+        messages, unfetched = get_gmail_sms(message_ids) if message_ids else ([], [])
+        
+        # Pub/Sub delivers at least once - let the UNIQUE index drop repeats.
+        # Claims and the historyId move together in one transaction. If any
+        # message failed to download the historyId stays put, so the next push
+        # lists it again (the ones claimed here are skipped then).
+        new_messages = []
+        with db_transaction() as db:
+            for message_data in messages:
+                cursor = db.execute(SQL_CLAIM_MESSAGE, (message_data['message_id'],))
+                if cursor.rowcount:
+                    new_messages.append(message_data)
+            if result['history_id'] and not unfetched:
+                db.execute(SQL_ADVANCE_HISTORY_ID, (result['history_id'],))
+        if unfetched:
+            log.warning("⚠️  %d Gmail message(s) failed to download; keeping the historyId for a retry",
+                        len(unfetched))
+        
+        # Messages are independent, so overlap their NLP and push notifications
+        for message_data in new_messages:
+            webhook_executor.submit(handle_gmail_sms, message_data)
+    except Exception as e:
+        log.exception("Error handling Gmail push")
+
+def handle_gmail_sms(message_data):
+    """Process one Gmail-forwarded SMS and push the reply (runs on webhook_executor)"""
+    try:
+        log.info("📨 Incoming SMS via Gmail (%s)", message_data['timestamp'])
+        log.debug("Message: %r", message_data['body'])
         
         # Process message with enhanced processor
-        processor = EnhancedMessageProcessor()
-        response_text = processor.process_message(message_data['body'])
+        response_text = message_processor.process_message(message_data['body'])
         
-        print(f"Response: {response_text}")
+        log.debug("Response: %s", response_text)
         
         # Send response via push notification
         if response_text:
@@ -949,11 +1461,34 @@ def gmail_webhook():
                 "Alfred the Butler", 
                 response_text
             )
+    except Exception as e:
+        log.exception("Error handling Gmail SMS")
+
+# Encoded once; compared in constant time so response timing doesn't leak the secret
+GMAIL_WEBHOOK_SECRET_BYTES = (config.GMAIL_WEBHOOK_SECRET or '').encode()
+
+@app.route('/webhook/gmail', methods=['POST'])
+def gmail_webhook():
+    """Handle incoming Gmail webhook (Google Voice SMS forwarded to Gmail)"""
+    try:
+        # Verify webhook secret (Pub/Sub push can't set headers, so also accept ?token=)
+        webhook_secret = request.headers.get('X-Webhook-Secret') or request.args.get('token')
+        if not (webhook_secret and GMAIL_WEBHOOK_SECRET_BYTES and
+                hmac.compare_digest(webhook_secret.encode(), GMAIL_WEBHOOK_SECRET_BYTES)):
+            return '', 403
+        
+        # Process webhook data
+        webhook_data = request.get_json()
+        if not webhook_data:
+            return '', 400
+        
+        # Ack right away - Pub/Sub redelivers if we take too long to respond
+        gmail_push_executor.submit(handle_gmail_push, webhook_data)
         
         return '', 200
         
     except Exception as e:
-        print(f"Error processing Gmail webhook: {e}")
+        log.exception("Error processing Gmail webhook")
         return '', 500
 
 @app.route('/webhook/sms', methods=['POST'])
@@ -962,14 +1497,11 @@ def sms_webhook():
     message_body = request.form.get('Body', '')
     from_number = request.form.get('From', '')
     
-    print(f"=== LEGACY SMS WEBHOOK ===")
-    print(f"Message: '{message_body}'")
-    print(f"From: '{from_number}'")
-    print("===========================")
+    log.info("📱 Legacy SMS webhook received from %s", from_number)
+    log.debug("Message: %r", message_body)
     
     # Process message
-    processor = EnhancedMessageProcessor()
-    response_text = processor.process_message(message_body)
+    response_text = message_processor.process_message(message_body)
     
     # For legacy webhook, return response in webhook format
     return jsonify({
@@ -977,6 +1509,26 @@ def sms_webhook():
         "timestamp": datetime.now().isoformat()
     })
 
+# Row counts for /health, refreshed at most once per DB_STATS_TTL seconds
+DB_STATS_TTL = 60
+_stats_cache = {'ts': 0.0, 'data': None}
+
+def get_db_stats(ttl=DB_STATS_TTL):
+    """Get the per-table row counts, re-counting only when the cached ones are stale"""
+    if _stats_cache['data'] is None or time.monotonic() - _stats_cache['ts'] > ttl:
+        # Count records in each table in a single round-trip
+        food_count, water_count, gym_count, reminder_count, calendar_count = \
+            read_db().execute(SQL_TABLE_COUNTS).fetchone()
+        _stats_cache['data'] = {
+            "food_logs": food_count,
+            "water_logs": water_count,
+            "gym_logs": gym_count,
+            "reminders_todos": reminder_count,
+            "calendar_events": calendar_count
+        }
+        _stats_cache['ts'] = time.monotonic()
+    return _stats_cache['data']
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for local testing"""
@@ -987,34 +1539,18 @@ def health_check():
         print(f"🔍 Testing database connection...")
         print(f"🔍 Database path: {config.DATABASE_PATH}")
         
+        # Row counts scan every table, so render.yaml's probe only checks the
+        # connection; ?verbose=1 adds the counts
+        verbose = request.args.get('verbose') == '1'
+        database_stats = None
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
+            db = read_db()
+            db.execute('SELECT 1').fetchone()
             print(f"✅ Database connection successful")
             
-            cursor = conn.cursor()
-            
-            # Test basic query
-            cursor.execute('SELECT name FROM sqlite_master WHERE type="table"')
-            tables = cursor.fetchall()
-            print(f"📊 Found {len(tables)} tables: {[table[0] for table in tables]}")
-            
-            # Count records in each table
-            cursor.execute('SELECT COUNT(*) FROM food_logs')
-            food_count = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM water_logs')
-            water_count = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM gym_logs')
-            gym_count = cursor.fetchone()[0]
+            if verbose:
+                database_stats = get_db_stats()
             
-            cursor.execute('SELECT COUNT(*) FROM reminders_todos')
-            reminder_count = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM calendar_events')
-            calendar_count = cursor.fetchone()[0]
-            
-            conn.close()
             print(f"✅ Database queries completed successfully")
             
         except Exception as db_error:
@@ -1038,19 +1574,16 @@ def health_check():
             "service": "Alfred the Butler (Cloud)",
             "environment": "production",
             "communication": comm_status,
-            "database_stats": {
-                "food_logs": food_count,
-                "water_logs": water_count,
-                "gym_logs": gym_count,
-                "reminders_todos": reminder_count,
-                "calendar_events": calendar_count
-            },
+            "database": "connected",
             "scheduled_jobs": [
                 "Morning Check-in (every day)",
-                "Reminder Checker (every 1m)",
-                "Daily Database Dump (5:00 AM)"
+                "Reminders (fire at their due time)",
+                "Daily Database Dump (5:00 AM)",
+                "Calendar Sync (every 5m)"
             ]
         }
+        if database_stats is not None:
+            response_data["database_stats"] = database_stats
         
         print(f"✅ Health check completed successfully")
         print(f"🏥 === HEALTH CHECK COMPLETE ===\n")
@@ -1091,39 +1624,23 @@ def send_push_notification(title, message):
 def morning_checkin():
     """Daily 8am check-in"""
     try:
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Get incomplete todos
-        cursor.execute('''
-            SELECT text FROM todos 
-            WHERE completed_at IS NULL
-            ORDER BY created_at
-        ''')
-        incomplete_todos = cursor.fetchall()
-        
-        # Get incomplete reminders from yesterday or earlier
         yesterday = datetime.now() - timedelta(days=1)
-        cursor.execute('''
-            SELECT text FROM reminders_todos 
-            WHERE completed_at IS NULL 
-            AND due_date <= ?
-            ORDER BY due_date
-        ''', (yesterday,))
-        incomplete_reminders = cursor.fetchall()
-        
-        # Get last gym session
-        cursor.execute('''
-            SELECT date, muscle_groups FROM gym_logs 
-            ORDER BY date DESC LIMIT 1
-        ''')
-        last_gym = cursor.fetchone()
         
-        # Get today's calendar events
-        today = datetime.now()
-        today_events = google_services.get_calendar_events(today, today + timedelta(days=1))
+        # Incomplete todos, incomplete reminders from yesterday or earlier and the
+        # last gym session, from one statement (so also one consistent snapshot)
+        incomplete_todos = []
+        incomplete_reminders = []
+        last_gym = None
+        for kind, value, notes in read_db().execute(SQL_MORNING_CHECKIN, (yesterday,)):
+            if kind == 'todo':
+                incomplete_todos.append((value,))
+            elif kind == 'reminder':
+                incomplete_reminders.append((value,))
+            else:
+                last_gym = (value, notes)
         
-        conn.close()
+        # Get today's calendar events from the synced cache (no Google round-trip)
+        today_events = message_processor.get_events_for_day(datetime.now())
         
         # Build message
         message_parts = ["Good morning! ☀️"]
@@ -1167,43 +1684,54 @@ def morning_checkin():
     except Exception as e:
         print(f"Error in morning check-in: {e}")
 
-def check_pending_reminders():
-    """Check for pending reminders every minute"""
+# Old Gmail SMS checking function removed - now using SignalWire webhooks
+
+def renew_gmail_watch():
+    """Register (or renew) Gmail push notifications to /webhook/gmail via Pub/Sub"""
     try:
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Get reminders that should be sent now
-        now = datetime.now()
-        cursor.execute('''
-            SELECT id, text FROM reminders 
-            WHERE sent = FALSE 
-            AND completed_at IS NULL
-            AND scheduled_time <= ?
-        ''', (now,))
-        
-        pending_reminders = cursor.fetchall()
-        
-        for reminder_id, reminder_text in pending_reminders:
-            # Send reminder via push notification
-            send_push_notification("Reminder", f"⏰ {reminder_text}")
-            
-            # Mark as sent
-            cursor.execute('''
-                UPDATE reminders SET sent = TRUE 
-                WHERE id = ?
-            ''', (reminder_id,))
-        
-        conn.commit()
-        conn.close()
-        
+        if google_services and google_services.gmail_service:
+            response = google_services.watch_gmail(config.GMAIL_PUBSUB_TOPIC)
+            if response and response.get('historyId'):
+                # First watch: start diffing history from here
+                db_writer.write(SQL_INIT_SYNC_STATE, ('gmail_history_id', str(response['historyId'])))
     except Exception as e:
-        print(f"Error checking reminders: {e}")
+        print(f"Error renewing Gmail watch: {e}")
 
-# Old Gmail SMS checking function removed - now using SignalWire webhooks
+def sync_calendar_events():
+    """Refresh the calendar_events cache so schedule checks don't wait on Google"""
+    try:
+        if not (google_services and google_services.calendar_service):
+            return
+        
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        end = today + timedelta(days=CALENDAR_SYNC_DAYS)
+        events = google_services.get_calendar_events(today, end)
+        if events is None:
+            # Keep the cached window rather than wiping it on a failed fetch
+            return
+        
+        # Replace the whole window so events deleted in Google drop out of the cache
+        window = (today.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+        with db_transaction() as db:
+            db.execute(SQL_CLEAR_CACHED_EVENTS, window)
+            db.executemany(SQL_CACHE_EVENT, [
+                (event['id'], event['summary'], event['start'], event['end'],
+                 event['location'], event['description'])
+                for event in events
+            ])
+    except Exception as e:
+        print(f"Error syncing calendar events: {e}")
+
+# Persist jobs in the app database so a restart doesn't lose scheduled work
+jobstores = {}
+if SQLAlchemyJobStore:
+    jobstores['default'] = SQLAlchemyJobStore(url=f'sqlite:///{config.DATABASE_PATH}')
+else:
+    print("⚠️  SQLAlchemy not installed, scheduler jobs will only be kept in memory")
 
 # Initialize the scheduler (after all functions are defined)
 scheduler = BackgroundScheduler(
+    jobstores=jobstores,
     job_defaults={
         'coalesce': True,
         'max_instances': 1,
@@ -1213,24 +1741,17 @@ scheduler = BackgroundScheduler(
 
 # Add jobs to scheduler
 scheduler.add_job(
-    func=morning_checkin,
+    func='app:morning_checkin',
     trigger='cron',
     hour=config.MORNING_CHECKIN_HOUR,
     id='morning_checkin',
     name='Morning Check-in',
+    misfire_grace_time=3600,  # Still send the check-in after a restart shortly past the hour
     replace_existing=True
 )
 
 scheduler.add_job(
-    func=check_reminders,
-    trigger=IntervalTrigger(minutes=1),
-    id='check_reminders',
-    name='Reminder Checker',
-    replace_existing=True
-)
-
-scheduler.add_job(
-    func=daily_database_dump,
+    func='app:daily_database_dump',
     trigger='cron',
     hour=5,
     id='daily_dump',
@@ -1238,25 +1759,73 @@ scheduler.add_job(
     replace_existing=True
 )
 
+scheduler.add_job(
+    func='app:sync_calendar_events',
+    trigger=IntervalTrigger(minutes=5),
+    id='sync_calendar_events',
+    name='Calendar Sync',
+    next_run_time=datetime.now(),  # Fill the cache right away on startup
+    replace_existing=True
+)
+
+scheduler.add_job(
+    func='app:prune_message_cache',
+    trigger=IntervalTrigger(days=1),
+    id='prune_message_cache',
+    name='Message Cache Pruning',
+    replace_existing=True
+)
+
+# Gmail push notifications expire after 7 days, renew them well before that
+if config.GMAIL_PUBSUB_TOPIC:
+    scheduler.add_job(
+        func='app:renew_gmail_watch',
+        trigger=IntervalTrigger(days=6),
+        id='renew_gmail_watch',
+        name='Gmail Watch Renewal',
+        replace_existing=True
+    )
+
+# Reminders fire from their own DateTrigger jobs - make sure every open one
+# has a job, even if the job store didn't survive the restart
+reschedule_pending_reminders()
+
 # Cleanup
+# atexit runs in reverse order: stop the scheduler before flushing the writer
+atexit.register(log_listener.stop)
+atexit.register(db_writer.stop)
 atexit.register(lambda: scheduler.shutdown())
 
-if __name__ == '__main__':
+def start_background_services():
+    """Claim the single-instance lock, then start the Gmail watch and the scheduler
+    
+    Called from __main__ for the dev server and from gunicorn.conf.py's
+    post_worker_init under gunicorn.
+    """
     # Check if another instance is already running
     if not check_single_instance():
-        exit(1)
+        return False
     
+    # Register Gmail push notifications so /webhook/gmail only fires on new mail
+    if config.GMAIL_PUBSUB_TOPIC:
+        renew_gmail_watch()
+    
+    # Start the scheduler
+    scheduler.start()
+    print("⏰ Background scheduler started")
+    return True
+
+if __name__ == '__main__':
     # Get port from environment (for cloud deployment) or use default
     port = int(os.getenv('PORT', 5001))
     host = '0.0.0.0' if os.getenv('RENDER') else 'localhost'
     
+    if not start_background_services():
+        exit(1)
+    
     print(f"🚀 Starting Alfred the Butler on {host}:{port}")
     print(f"🌐 Health check: http://{host}:{port}/health")
     print(f"📱 SignalWire webhook: http://{host}:{port}/webhook/signalwire")
     
-    # Start the scheduler
-    scheduler.start()
-    print("⏰ Background scheduler started")
-    
-    # Start the Flask app
+    # Start the Flask app (development server; production runs under gunicorn)
     app.run(host=host, port=port, debug=False)
@@ -3,24 +3,31 @@ Communication Service for Alfred the Butler
 Handles SMS via SignalWire and push notifications as fallback
 """
 
-import os
-import sys
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from typing import Optional, Dict, Any
 
-# Add src directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from config import Config
 
 class CommunicationService:
     """Handles all communication methods for Alfred the Butler"""
     
     def __init__(self):
-        self.config = Config()
+        # Settings are class attributes read from the environment at import
+        self.config = Config
         self.mode = self.config.COMMUNICATION_MODE
         
+        # One session for outbound HTTPS so push notifications reuse a kept-alive
+        # TLS connection instead of handshaking on every send
+        self.http = requests.Session()
+        self.http.mount('https://', HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        ))
+        
         # Initialize SignalWire client if SMS mode is enabled
         self.signalwire_client = None
         if self.mode in ['sms', 'hybrid']:
@@ -115,7 +122,7 @@ class CommunicationService:
         """Send push notification via Pushover"""
         try:
             # Send email to Pushover alias
-            response = requests.post(
+            response = self.http.post(
                 'https://api.mailgun.net/v3/your-domain.com/messages',
                 auth=('api', 'your-mailgun-key'),
                 data={
@@ -9,6 +9,7 @@ class Config:
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
     GMAIL_WEBHOOK_SECRET = os.getenv('GMAIL_WEBHOOK_SECRET')
+    GMAIL_PUBSUB_TOPIC = os.getenv('GMAIL_PUBSUB_TOPIC')  # projects/<project>/topics/<topic> for Gmail push
     GOOGLE_CREDENTIALS_FILE = os.path.join(
         os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
         'config',
@@ -31,6 +32,7 @@ class Config:
     MORNING_CHECKIN_HOUR = int(os.getenv('MORNING_CHECKIN_HOUR', 8))
     GMAIL_POLLING_INTERVAL = int(os.getenv('GMAIL_POLLING_INTERVAL', 5))
     EVENING_REMINDER_HOUR = int(os.getenv('EVENING_REMINDER_HOUR', 20))
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')  # set to DEBUG to log NLP results per message
     
     # Database
     DATABASE_PATH = os.path.join(
@@ -9,6 +9,7 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import base64
 import email
+import email.policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -30,6 +31,16 @@ SCOPES = [
     'https://www.googleapis.com/auth/calendar.events'
 ]
 
+# Gmail accepts at most 100 calls in a single batch request
+GMAIL_BATCH_LIMIT = 100
+
+# Server-side filter for Google Voice SMS forwarded to the inbox
+GOOGLE_VOICE_QUERY = 'from:voice.google.com'
+
+# How far back to look for SMS when the stored historyId has expired (Gmail
+# keeps at least a week of history; processed_messages drops repeats)
+GMAIL_RESYNC_WINDOW = timedelta(days=7)
+
 class GoogleServicesManager:
     def __init__(self):
         self.config = Config()
@@ -182,54 +193,196 @@ Subject: {subject}
             print(f"Error sending to Pushover email: {e}")
             return False
     
-    def process_gmail_webhook(self, webhook_data: Dict) -> Optional[Dict]:
-        """Process incoming Gmail webhook data"""
+    def watch_gmail(self, topic_name: str) -> Optional[Dict]:
+        """Register Gmail push notifications to a Cloud Pub/Sub topic
+        
+        Gmail expires the watch after 7 days, so it must be renewed periodically.
+        """
         try:
-            # Extract message data
-            message_id = webhook_data.get('message', {}).get('data', '')
-            if not message_id:
-                return None
-            
-            # Get full message
-            message = self.gmail_service.users().messages().get(
-                userId='me', id=message_id).execute()
-            
-            # Check if it's from Google Voice
-            headers = message['payload']['headers']
-            from_header = next((h['value'] for h in headers if h['name'] == 'From'), '')
+            response = self.gmail_service.users().watch(
+                userId='me',
+                body={
+                    'topicName': topic_name,
+                    'labelIds': ['INBOX']
+                }
+            ).execute()
             
-            if 'voice.google.com' not in from_header:
-                return None
+            print(f"📬 Gmail watch registered (historyId {response.get('historyId')})")
+            return response
             
-            # Extract SMS content
-            body = self._extract_message_body(message)
-            if not body:
+        except HttpError as error:
+            print(f"Error registering Gmail watch: {error}")
+            return None
+    
+    def parse_pubsub_notification(self, webhook_data: Dict) -> Optional[Dict]:
+        """Decode a Pub/Sub push envelope into Gmail's {emailAddress, historyId} payload"""
+        data = webhook_data.get('message', {}).get('data', '')
+        if not data:
+            return None
+        
+        try:
+            return json.loads(base64.urlsafe_b64decode(data).decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as e:
+            print(f"Error decoding Pub/Sub notification: {e}")
+            return None
+    
+    def list_new_message_ids(self, start_history_id: str) -> Optional[List[str]]:
+        """List messages added to the inbox since start_history_id
+        
+        Returns None if Gmail no longer has that much history (the caller should
+        resync with a query). Any other HttpError is raised.
+        """
+        message_ids = []
+        page_token = None
+        try:
+            while True:
+                response = self.gmail_service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'],
+                    labelId='INBOX',
+                    pageToken=page_token
+                ).execute()
+                
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message_id = added['message']['id']
+                        if message_id not in message_ids:
+                            message_ids.append(message_id)
+                
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    return message_ids
+                
+        except HttpError as error:
+            if error.resp.status == 404:
+                print(f"Gmail history {start_history_id} has expired, resyncing")
                 return None
+            print(f"Error listing Gmail history: {error}")
+            raise
+    
+    def list_recent_voice_message_ids(self, since: datetime) -> List[str]:
+        """List Google Voice SMS received since `since`, filtered by Gmail itself
+        
+        Raises HttpError if Gmail can't be listed.
+        """
+        message_ids = []
+        page_token = None
+        try:
+            while True:
+                response = self.gmail_service.users().messages().list(
+                    userId='me',
+                    labelIds=['INBOX'],
+                    q=f"{GOOGLE_VOICE_QUERY} after:{int(since.timestamp())}",
+                    pageToken=page_token
+                ).execute()
+                message_ids.extend(message['id'] for message in response.get('messages', []))
+                
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    # Oldest first, like the history listing
+                    return message_ids[::-1]
             
-            return {
-                'message_id': message_id,
-                'body': body,
-                'timestamp': datetime.fromtimestamp(
-                    int(message['internalDate']) / 1000
-                ).isoformat()
-            }
-            
+        except HttpError as error:
+            print(f"Error listing Gmail messages: {error}")
+            raise
+    
+    def process_gmail_webhook(self, webhook_data: Dict, start_history_id: Optional[str]) -> Dict:
+        """Process a Gmail push notification
+        
+        Returns the notification's historyId (to store for the next push) and the
+        IDs of messages added since start_history_id; if that history has expired,
+        the Google Voice SMS from the last GMAIL_RESYNC_WINDOW instead. Fetch the
+        ones that still need handling with fetch_voice_sms.
+        
+        Raises HttpError if Gmail can't be listed, so the caller keeps its
+        historyId and the next push retries.
+        """
+        notification = self.parse_pubsub_notification(webhook_data)
+        if not notification or 'historyId' not in notification:
+            return {'history_id': None, 'message_ids': []}
+        
+        history_id = str(notification['historyId'])
+        if not start_history_id:
+            # Nothing to diff against yet: pick up the last few minutes of SMS
+            # with a query and start tracking history from this push
+            since = datetime.now() - timedelta(minutes=10)
+            return {'history_id': history_id, 'message_ids': self.list_recent_voice_message_ids(since)}
+        
+        message_ids = self.list_new_message_ids(start_history_id)
+        if message_ids is None:
+            since = datetime.now() - GMAIL_RESYNC_WINDOW
+            message_ids = self.list_recent_voice_message_ids(since)
+        return {'history_id': history_id, 'message_ids': message_ids}
+    
+    def fetch_voice_sms(self, message_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """Fetch Gmail messages in batched requests, parsing the Google Voice SMS
+        
+        Every message that was fetched gets an entry: its SMS dict, or None if it
+        isn't a Google Voice SMS. Messages that failed to fetch are left out.
+        """
+        try:
+            # raw is one base64 MIME blob - smaller than the full JSON part tree
+            messages = self.get_messages(message_ids, msg_format='raw')
         except HttpError as error:
             print(f"Error processing Gmail webhook: {error}")
+            return {}
+        
+        return {
+            message_id: self._parse_voice_sms(message_id, message)
+            for message_id, message in messages.items()
+        }
+    
+    def get_messages(self, message_ids: List[str], msg_format: str = 'full') -> Dict[str, Dict]:
+        """Fetch several Gmail messages with one HTTP round-trip per 100 messages"""
+        messages = {}
+        
+        def on_message(request_id, response, exception):
+            if exception is not None:
+                print(f"Error fetching Gmail message {request_id}: {exception}")
+                return
+            messages[request_id] = response
+        
+        for start in range(0, len(message_ids), GMAIL_BATCH_LIMIT):
+            batch = self.gmail_service.new_batch_http_request(callback=on_message)
+            for message_id in message_ids[start:start + GMAIL_BATCH_LIMIT]:
+                batch.add(
+                    self.gmail_service.users().messages().get(
+                        userId='me', id=message_id, format=msg_format),
+                    request_id=message_id
+                )
+            batch.execute()
+        
+        return messages
+    
+    def _parse_voice_sms(self, message_id: str, message: Dict) -> Optional[Dict]:
+        """Extract SMS data from a raw-format Gmail message if it was forwarded by Google Voice"""
+        mime = email.message_from_bytes(
+            base64.urlsafe_b64decode(message['raw']), policy=email.policy.default)
+        
+        # Check if it's from Google Voice
+        if 'voice.google.com' not in mime.get('From', ''):
+            return None
+        
+        # Extract SMS content
+        body = self._extract_message_body(mime)
+        if not body:
             return None
+        
+        return {
+            'message_id': message_id,
+            'body': body,
+            'timestamp': datetime.fromtimestamp(
+                int(message['internalDate']) / 1000
+            ).isoformat()
+        }
     
-    def _extract_message_body(self, message: Dict) -> Optional[str]:
-        """Extract text body from Gmail message"""
+    def _extract_message_body(self, mime: email.message.EmailMessage) -> Optional[str]:
+        """Extract text body from a parsed MIME message"""
         try:
-            if 'parts' in message['payload']:
-                for part in message['payload']['parts']:
-                    if part['mimeType'] == 'text/plain':
-                        data = part['body']['data']
-                        return base64.urlsafe_b64decode(data).decode('utf-8')
-            else:
-                # Single part message
-                data = message['payload']['body']['data']
-                return base64.urlsafe_b64decode(data).decode('utf-8')
+            part = mime.get_body(preferencelist=('plain',))
+            if part:
+                return part.get_content()
         except Exception as e:
             print(f"Error extracting message body: {e}")
         
@@ -357,8 +510,8 @@ Subject: {subject}
             return None
     
     def get_calendar_events(self, start_date: datetime, 
-                           end_date: datetime = None) -> List[Dict]:
-        """Get calendar events for date range"""
+                           end_date: datetime = None) -> Optional[List[Dict]]:
+        """Get calendar events for date range (None if Google couldn't be reached)"""
         try:
             if not end_date:
                 end_date = start_date + timedelta(days=1)
@@ -386,7 +539,7 @@ Subject: {subject}
             
         except HttpError as error:
             print(f"Error getting calendar events: {error}")
-            return []
+            return None
     
     def update_calendar_event(self, event_id: str, **kwargs) -> bool:
         """Update existing calendar event"""
@@ -0,0 +1,25 @@
+"""
+Gunicorn settings for Alfred the Butler (run from src/: gunicorn app:app)
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+
+# One worker: the scheduler, the database writer thread and the single-instance
+# lock all live in-process. Threads give the webhooks their concurrency.
+workers = 1
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Loading the NLP models takes a while on a cold start
+timeout = 120
+
+def post_worker_init(worker):
+    """Start the scheduler and Gmail watch inside the worker that serves requests"""
+    from app import start_background_services
+    if not start_background_services():
+        # Exiting would only make the master respawn the worker in a loop; keep
+        # serving webhooks and leave the scheduled jobs to the lock holder
+        worker.log.warning("Another instance holds the scheduler lock; "
+                           "this worker runs without background services")
@@ -6,41 +6,309 @@ Intelligent NLP Processor using Hugging Face Transformers
 import re
 import json
 import os
+import functools
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import torch
 import numpy as np
 from datetime import datetime, timedelta
 import re
 from spellchecker import SpellChecker
 
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Dynamically quantized (int8) ONNX export shipped in the model's hub repo. Other
+# variants there: onnx/model_qint8_avx512_vnni.onnx (x86 with VNNI), onnx/model_qint8_arm64.onnx
+ONNX_MODEL_FILE = 'onnx/model_qint8_avx2.onnx'
+
+# Google Voice metadata stripped by clean_message with plain str.replace, in order
+CLEAN_LITERALS = ('YOUR ACCOUNT HELP CENTER', '1707989', '1600 Am', '94043', '00 Am')
+
+# URLs and artifacts stripped after the literals, in order
+CLEAN_STEPS = [
+    (re.compile(r'<https?://[^>]+>'), ''),
+    (re.compile(r'[0-9]{7,}'), ''),  # Remove long numbers
+    (re.compile(r'\b[0-9]{1,2}\s+[AP]m\b'), ''),  # Remove time artifacts
+]
+
+# Day offsets for relative date words and weekday numbers for day names
+RELATIVE_DATE_OFFSETS = {
+    'today': 0,
+    'tomorrow': 1,
+    'tonight': 0,
+    'this evening': 0,
+    'this afternoon': 0,
+    'this morning': 0
+}
+DAY_MAP = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+# Entity extraction patterns
+WITH_PERSON_RE = re.compile(r'with\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)', re.IGNORECASE)
+MEETING_PERSON_RE = re.compile(r'meeting\s+with\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)', re.IGNORECASE)
+TIME_RES = [
+    re.compile(r'(\d{1,2}):?(\d{2})?\s*(am|pm)?', re.IGNORECASE),  # 3pm, 2:30pm, 14:00
+    re.compile(r'(\d{1,2})\s*(am|pm)', re.IGNORECASE),
+    re.compile(r'(\d{1,2})\s*oclock', re.IGNORECASE),
+]
+DAY_NAME_RE = re.compile(r'(monday|tuesday|wednesday|thursday|friday|saturday|sunday)', re.IGNORECASE)
+TIME_RANGE_RE = re.compile(r'(\d{1,2})-(\d{1,2})\s*(am|pm)?', re.IGNORECASE)
+AT_LOCATION_RE = re.compile(r'at\s+([^.!?]+?)(?:\s+(?:tomorrow|today|tonight|this|next|on|with|for))', re.IGNORECASE)
+NUMBER_RE = re.compile(r'\b(\d+\.?\d*)\b')
+EXERCISE_RE = re.compile(r'(\w+)\s+(\d+)(?:x|×)(\d+)')
+
+# Exercise patterns tried when the entities have none (matched lowercased)
+# bench 225x5 / bench 225 x 5 / bench 225 for 5 / bench 225 reps, in one pass
+EXERCISE_TEXT_RE = re.compile(r'(\w+)\s+(\d+)\s*(?:x\s*(\d+)|for\s*(\d+)|reps?)')
+
+# Muscle group named in a gym message ("hit chest today"), else inferred from the
+# first exercise whose name starts with one of these
+MUSCLE_GROUP_RE = re.compile(
+    r'\b(chest|back|legs?|shoulders?|arms?|biceps|triceps|core|abs|glutes|cardio)\b', re.IGNORECASE
+)
+EXERCISE_MUSCLE_GROUPS = {
+    'bench': 'chest', 'incline': 'chest', 'decline': 'chest', 'fly': 'chest', 'dip': 'chest',
+    'squat': 'legs', 'lunge': 'legs', 'rdl': 'legs', 'calf': 'legs',
+    'deadlift': 'back', 'row': 'back', 'pullup': 'back', 'chinup': 'back', 'lat': 'back',
+    'ohp': 'shoulders', 'lateral': 'shoulders', 'shrug': 'shoulders',
+    'curl': 'arms', 'extension': 'arms', 'pushdown': 'arms', 'skullcrusher': 'arms',
+}
+DEFAULT_MUSCLE_GROUP = 'general'
+
+# Photo/Drive destinations, most specific first (matched lowercased)
+FOLDER_RES = [
+    re.compile(r'(?:to|in|into)\s+(\w+\s+folder)'),
+    re.compile(r'(?:to|in|into)\s+(\w+\s+album)'),
+    re.compile(r'(?:to|in|into)\s+(\w+\s+drive)'),
+    re.compile(r'(?:to|in|into)\s+(\w+)'),  # Generic destination
+]
+
+# Common food keywords for messages that don't name a database food. Longest
+# first, so at any position the alternation prefers 'sweet potato' to 'potato'.
+FOOD_KEYWORDS = [
+    'ice cream', 'chicken', 'beef', 'pork', 'fish', 'salmon', 'tuna',
+    'rice', 'pasta', 'bread', 'toast', 'eggs', 'oatmeal', 'cereal',
+    'apple', 'banana', 'orange', 'grapes', 'berries', 'vegetables',
+    'broccoli', 'carrots', 'spinach', 'lettuce', 'tomato', 'onion',
+    'potato', 'sweet potato', 'corn', 'peas', 'beans', 'nuts',
+    'almonds', 'walnuts', 'peanuts', 'protein bar', 'shake', 'smoothie'
+]
+FOOD_KEYWORD_RE = re.compile('|'.join(map(re.escape, sorted(FOOD_KEYWORDS, key=len, reverse=True))))
+
+# Reminder triggers in priority order; the captured tail is the reminder text.
+# Each alternative skips ahead lazily to its trigger, so an earlier trigger
+# anywhere in the message beats a later one that appears first in the text.
+REMINDER_TRIGGERS = ['remind me to', 'reminder to', "don't forget to", 'call', 'text', 'email']
+REMINDER_TRIGGER_RE = re.compile(
+    '^(?:' + '|'.join('.*?' + re.escape(trigger) for trigger in REMINDER_TRIGGERS) + r')\s*(.*)',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Todo phrasing stripped from a todo message, leaving just the tasks
+TODO_TRIGGER_RE = re.compile(
+    r'\b(?:add|put)\s+(?:this\s+)?(?:to|on)\s+(?:my\s+|the\s+)?(?:(?:todo|to-do|to do|task)\s*)?(?:list|tasks)\b'
+    r'|\b(?:to|on)\s+(?:my|the)\s+(?:(?:todo|to-do|to do|task)\s*)?list\b'
+    r'|\badd\s+to\s+(?:todo|tasks)\b'
+    r'|\b(?:add|create|new)\s+(?:a\s+)?(?:todo|task)\b'
+    r'|\b(?:todo|to-do|task)\s*:'
+    r'|\bneed\s+to\s+remember(?:\s+to)?\b'
+    r'|\bremember\s+to\b'
+    r'|\bneed\s+to\s+do\b'
+    r'|^\s*add\b',
+    re.IGNORECASE
+)
+# Several tasks in one message are separated by commas or semicolons
+TODO_SPLIT_RE = re.compile(r'[,;]+')
+TODO_TASK_STRIP = ' .:-'
+
+# Time references stripped from reminder text, along with the whitespace around them
+REMINDER_TIME_WORDS_RE = re.compile(r'\s*\b(?:this evening|tonight|tomorrow|today)\b\s*', re.IGNORECASE)
+
+# Amount patterns for water and portions (matched against the lowercased message),
+# each a single alternation so the message is scanned once
+WATER_UNIT_ML = {
+    'oz': 29.5735,  # 1 oz = 29.5735 ml
+    'ounce': 29.5735,
+    'ml': 1.0,
+    'milliliter': 1.0,
+    'cup': 236.588,  # 1 cup = 236.588 ml
+    'glass': 236.588,  # Assume 1 glass = 1 cup
+    'bottle': 500.0,  # Assume 1 bottle = 500 ml
+}
+WATER_AMOUNT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(oz|ounce|ml|milliliter|cup|glass|bottle)')
+PORTION_RE = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(?:serving|piece|slice|bowl|plate|cup|tablespoon|tbsp|teaspoon|tsp)'
+)
+FRACTION_RE = re.compile(r'(?:(\d+)\s*&\s*)?(\d+)/(\d+)')  # 1/2, 3/4, 1 & 1/2
+
+# Common typos that affect intent classification, fixed before spell checking
+COMMON_TYPOS = {
+    'are': 'ate',  # "are half a tub" -> "ate half a tub"
+    'eated': 'ate',
+    'eaten': 'ate',
+    'drinked': 'drank',
+    'drunk': 'drank',
+    'hitted': 'hit',
+    'workout out': 'worked out',
+    'workouted': 'worked out',
+}
+
+# Longest first so multi-word typos win over their prefixes
+COMMON_TYPOS_RE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(typo) for typo in sorted(COMMON_TYPOS, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+
+# Words containing these are never spell checked
+SPELL_CHECK_SKIP_RE = re.compile(r'[0-9@#$%^&*()]')
+
+# Words pulled out of the app's own phrases to add to the spell checker's dictionary
+SPELL_WORD_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+# Keyword fallback, in priority order: schedule > calendar > food > water > gym > reminders > todos > photo > drive
+FALLBACK_INTENT_KEYWORDS = [
+    ('schedule_check', [
+        'schedule', 'what\'s', 'what is', 'what do i have', 'what\'s happening',
+        'what\'s going on', 'what\'s planned', 'what\'s coming up', 'check my',
+        'show my', 'my schedule', 'my calendar'
+    ]),
+    ('calendar_event', [
+        'meeting', 'appointment', 'lunch with', 'dinner with', 'coffee with',
+        'block', 'schedule', 'add event', 'create event', 'new event'
+    ]),
+    # Food logging (prioritize over gym)
+    ('food_logging', [
+        'ate', 'had', 'consumed', 'breakfast', 'lunch', 'dinner', 'snack',
+        'chicken', 'rice', 'salad', 'pasta', 'protein', 'shake', 'smoothie',
+        'apple', 'banana', 'ice cream', 'tub of', 'half of', 'quarter of'
+    ]),
+    ('water_logging', [
+        'drank', 'water', 'bottle', 'oz', 'ml', 'liter', 'litre'
+    ]),
+    ('gym_workout', [
+        'workout', 'gym', 'lifted', 'bench', 'squat', 'deadlift', 'pull up',
+        'push up', 'crunch', 'plank', 'cardio', 'ran', 'biked', 'swam'
+    ]),
+    ('reminder_set', [
+        'remind', 'reminder', 'don\'t forget', 'remember to'
+    ]),
+    ('todo_add', [
+        'todo', 'task', 'add to', 'create', 'new'
+    ]),
+    ('photo_upload', [
+        'photo', 'image', 'picture', 'receipt', 'document', 'save this'
+    ]),
+    ('drive_organization', [
+        'organize', 'folder', 'categorize', 'file', 'put in', 'move to'
+    ]),
+]
+
+# All keywords compiled into one regex with a group per intent (group number =
+# priority rank). The lookahead makes every position a candidate, so a match
+# for one intent never hides an overlapping keyword for another.
+FALLBACK_KEYWORD_RE = re.compile('(?=' + '|'.join(
+    '(' + '|'.join(re.escape(keyword) for keyword in keywords) + ')'
+    for _, keywords in FALLBACK_INTENT_KEYWORDS
+) + ')')
+
+# Calendar event types, in priority order, and their keyword regex (built like
+# FALLBACK_KEYWORD_RE)
+EVENT_TYPE_KEYWORDS = [
+    ('meeting', ['meeting', 'mtg', 'sync']),
+    ('call', ['call', 'phone', 'zoom', 'video']),
+    ('appointment', ['appointment', 'apt', 'visit']),
+    ('lunch', ['lunch', 'dinner', 'breakfast', 'meal']),
+    ('workout', ['workout', 'gym', 'exercise', 'training']),
+]
+EVENT_TYPE_RE = re.compile('(?=' + '|'.join(
+    '(' + '|'.join(re.escape(keyword) for keyword in keywords) + ')'
+    for _, keywords in EVENT_TYPE_KEYWORDS
+) + ')')
+
+# Below MIN_SIMILARITY the keyword fallback decides; at CONFIDENT_SIMILARITY or
+# above the regex-cleaned message is trusted without a spell check
+MIN_SIMILARITY = 0.5
+CONFIDENT_SIMILARITY = 0.7
+
+# How many classified messages clean_message remembers the chosen text for
+# (as many as the app's parsed-message cache holds)
+CLASSIFIED_TEXT_CACHE_SIZE = 512
+
 class IntelligentNLPProcessor:
+    # The sentence transformer is loaded once per process and shared by every instance
+    _shared_model = None
+    _model_lock = threading.Lock()
+    
     def __init__(self, food_db=None):
         """Initialize the intelligent NLP processor with custom data"""
         print("🧠 Initializing Intelligent NLP Processor...")
         
         # Load sentence transformer model
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("✅ Sentence transformer model loaded")
+        self.model = self._get_shared_model()
         
         # Initialize spell checker
         self.spell_checker = SpellChecker()
         print("✅ Spell checker initialized")
         
+        # analyze() and the parse_* helpers the handlers call next all start by
+        # cleaning the same message; the spell check runs once per distinct text
+        self._deep_clean = functools.lru_cache(maxsize=256)(self._deep_clean)
+        
+        # Regex-cleaned text -> the text classification settled on (spell checked
+        # or not), so the parse_* helpers work from the same text as the intent
+        self._classified_text = {}
+        self._classified_text_lock = threading.Lock()
+        
         # Load custom common sayings
         self.common_sayings = self._load_common_sayings()
         
         # Load custom food database
         self.food_db = food_db or self._load_food_database()
         
+        # Every food name in one regex so parse_food scans the message once. Longest
+        # names first, so 'grilled chicken breast' wins over any shorter name inside it
+        self.food_items = self._index_food_db()
+        self.food_name_re = re.compile('|'.join(
+            map(re.escape, sorted(self.food_items, key=len, reverse=True))
+        )) if self.food_items else None
+        
         # Create intent examples from custom sayings
         self.intent_examples = self._create_intent_examples()
         
-        # Pre-compute embeddings for all examples
-        self.example_embeddings = self.model.encode(self.intent_examples)
+        # Words from our own examples and food names are never misspellings, so
+        # they skip the (slow, edit-distance) correction lookup entirely
+        self.spell_checker.word_frequency.load_words(self._domain_vocabulary())
+        self._spell_correction = functools.lru_cache(maxsize=1024)(self.spell_checker.correction)
+        
+        # Pre-compute embeddings for all examples, L2-normalized so a dot product is
+        # the cosine similarity. intent_examples is built in common_sayings order, so
+        # each intent owns a contiguous run starting at its intent_slice_starts entry.
+        # encode() length-sorts the flat list into batches itself and returns rows in
+        # input order, so larger batches just mean fewer padded forward passes.
+        self.example_embeddings = np.ascontiguousarray(
+            self.model.encode(
+                self.intent_examples,
+                batch_size=64,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            ),
+            dtype=np.float32,
+        )
+        self.intent_names = []
+        self.intent_slice_starts = []
+        start = 0
+        for intent, phrases in self.common_sayings.items():
+            if phrases:
+                self.intent_names.append(intent)
+                self.intent_slice_starts.append(start)
+                start += len(phrases)
+        self.intent_slice_starts = np.array(self.intent_slice_starts, dtype=np.intp)
         print("✅ Intent embeddings created")
         
         # Time parsing patterns
@@ -55,6 +323,41 @@ class IntelligentNLPProcessor:
         
         print("🧠 Intelligent NLP Processor ready!")
     
+    @classmethod
+    def _get_shared_model(cls):
+        """Return the process-wide sentence transformer, loading it on first use"""
+        with cls._model_lock:
+            if cls._shared_model is None:
+                cls._shared_model = cls._load_model()
+            return cls._shared_model
+    
+    @staticmethod
+    def _load_model():
+        """Load the sentence transformer, preferring its int8-quantized ONNX export on CPU
+        
+        Needs sentence-transformers>=3.2 with optimum[onnxruntime]; otherwise (or if
+        NLP_ONNX_MODEL_FILE is set empty) falls back to the regular PyTorch model.
+        With a CUDA device the PyTorch model is used, which SentenceTransformer
+        places on the GPU by itself.
+        """
+        if torch.cuda.is_available():
+            model = SentenceTransformer(MODEL_NAME, device='cuda')
+            print("✅ Sentence transformer model loaded (CUDA)")
+            return model
+        
+        onnx_file = os.getenv('NLP_ONNX_MODEL_FILE', ONNX_MODEL_FILE)
+        if onnx_file:
+            try:
+                model = SentenceTransformer(MODEL_NAME, backend='onnx', model_kwargs={'file_name': onnx_file})
+                print(f"✅ Sentence transformer model loaded (ONNX {onnx_file})")
+                return model
+            except Exception as e:
+                print(f"⚠️  ONNX model unavailable ({e}), using PyTorch")
+        
+        model = SentenceTransformer(MODEL_NAME)
+        print("✅ Sentence transformer model loaded")
+        return model
+    
     def _load_common_sayings(self):
         """Load custom common sayings from file"""
         try:
@@ -150,206 +453,194 @@ class IntelligentNLPProcessor:
             examples.extend(phrases)
         return examples
     
+    def _domain_vocabulary(self) -> set:
+        """Lowercased words used by the intent examples and the food database"""
+        vocabulary = set()
+        for phrase in self.intent_examples:
+            vocabulary.update(SPELL_WORD_RE.findall(phrase.lower()))
+        for food_text in self.food_items:
+            vocabulary.update(SPELL_WORD_RE.findall(food_text))
+        return vocabulary
+    
+    def _index_food_db(self) -> Dict[str, Tuple[str, Dict]]:
+        """Map each food's lowercased text ('ice cream') to its (name, entry)
+        
+        Handles both flat {name: info} files and ones grouped by category.
+        """
+        items = {}
+        for key, value in self.food_db.items():
+            if not isinstance(value, dict):
+                continue
+            entries = {key: value} if 'calories' in value else value
+            for name, info in entries.items():
+                if isinstance(info, dict) and 'calories' in info:
+                    items[name.replace('_', ' ').lower()] = (name, info)
+        return items
+    
     def clean_message(self, message: str) -> str:
-        """Clean and normalize the message text"""
+        """Clean and normalize the message text
+        
+        A message that has been classified gets the exact text classification
+        used, so a confident match isn't spell checked here after all.
+        """
+        clean_message = self._fast_clean(message)
+        with self._classified_text_lock:
+            classified_text = self._classified_text.get(clean_message)
+        if classified_text is not None:
+            return classified_text
+        return self._deep_clean(clean_message)
+    
+    def _remember_classified_text(self, fast_clean: str, clean_message: str):
+        """Record the text a message was classified from (bounded, oldest dropped first)"""
+        with self._classified_text_lock:
+            self._classified_text.pop(fast_clean, None)
+            if len(self._classified_text) >= CLASSIFIED_TEXT_CACHE_SIZE:
+                del self._classified_text[next(iter(self._classified_text))]
+            self._classified_text[fast_clean] = clean_message
+    
+    def _fast_clean(self, message: str) -> str:
+        """Regex-only cleanup: strip metadata and artifacts and fix common typos"""
         if not message:
             return ""
         
-        # Remove Google Voice metadata and URLs
-        message = re.sub(r'<https?://[^>]+>', '', message)
-        message = re.sub(r'YOUR ACCOUNT HELP CENTER', '', message)
-        message = re.sub(r'1707989', '', message)
-        message = re.sub(r'1600 Am', '', message)
-        message = re.sub(r'94043', '', message)
-        message = re.sub(r'00 Am', '', message)
-        
-        # Remove common Google Voice artifacts
-        message = re.sub(r'[0-9]{7,}', '', message)  # Remove long numbers
-        message = re.sub(r'\b[0-9]{1,2}\s+[AP]m\b', '', message)  # Remove time artifacts
-        
-        # Remove extra whitespace and normalize
-        message = re.sub(r'\s+', ' ', message)
-        message = message.strip()
+        # Remove Google Voice metadata, URLs and artifacts, then normalize whitespace
+        for literal in CLEAN_LITERALS:
+            message = message.replace(literal, '')
+        for pattern, replacement in CLEAN_STEPS:
+            message = pattern.sub(replacement, message)
+        message = ' '.join(message.split())
         
         # Fix common typos
-        message = self._fix_common_typos(message)
-        
-        # Spell check the message
-        message = self._spell_check_message(message)
-        
-        return message
+        return self._fix_common_typos(message)
+    
+    def _deep_clean(self, message: str) -> str:
+        """Spell check a message that has already been through _fast_clean"""
+        if not message:
+            return ""
+        return self._spell_check_message(message)
     
     def _fix_common_typos(self, message: str) -> str:
         """Fix common typos that affect intent classification"""
-        # Common food-related typos
-        typos = {
-            'are': 'ate',  # "are half a tub" -> "ate half a tub"
-            'eated': 'ate',
-            'eaten': 'ate',
-            'drinked': 'drank',
-            'drunk': 'drank',
-            'hitted': 'hit',
-            'hitted the': 'hit the',
-            'workout out': 'worked out',
-            'workouted': 'worked out',
-            'meeting with': 'meeting with',  # Keep as is
-            'appointment with': 'appointment with'  # Keep as is
-        }
-        
-        message_lower = message.lower()
-        for typo, correction in typos.items():
-            if typo in message_lower:
-                # Replace the typo with correction (case-insensitive)
-                message = re.sub(rf'\b{typo}\b', correction, message, flags=re.IGNORECASE)
-        
-        return message
+        # One pass over the message for every typo at once
+        return COMMON_TYPOS_RE.sub(lambda match: COMMON_TYPOS[match.group(0).lower()], message)
     
     def _spell_check_message(self, message: str) -> str:
         """Spell check and correct the message"""
         words = message.split()
-        corrected_words = []
         
+        # Skip very short words and words with numbers or special characters;
+        # look the rest up in one set operation and only correct the unknown ones
+        candidates = [word for word in words if len(word) > 2 and not SPELL_CHECK_SKIP_RE.search(word)]
+        unknown = self.spell_checker.unknown(candidates) if candidates else set()
+        if not unknown:
+            return ' '.join(words)
+        
+        corrected_words = []
         for word in words:
-            # Skip words with numbers or special characters
-            if re.search(r'[0-9@#$%^&*()]', word):
-                corrected_words.append(word)
-                continue
-            
-            # Skip very short words
-            if len(word) <= 2:
-                corrected_words.append(word)
-                continue
-            
-            # Check if word is misspelled
-            if word.lower() not in self.spell_checker:
+            if word.lower() in unknown:
                 # Get the most likely correction
-                correction = self.spell_checker.correction(word)
+                correction = self._spell_correction(word)
                 if correction and correction != word:
                     corrected_words.append(correction)
                     print(f"🔤 Spell corrected: '{word}' -> '{correction}'")
-                else:
-                    corrected_words.append(word)
-            else:
-                corrected_words.append(word)
+                    continue
+            corrected_words.append(word)
         
         return ' '.join(corrected_words)
     
+    def analyze(self, message: str) -> Tuple[str, Dict]:
+        """Classify intent and extract entities, cleaning the message only once"""
+        intent, clean_message = self._classify_messages([message])[0]
+        return intent, self._extract_entities_clean(clean_message, datetime.now())
+    
+    def analyze_batch(self, messages: List[str]) -> List[Tuple[str, Dict]]:
+        """analyze() for several messages, encoding them together in one batch"""
+        now = datetime.now()
+        return [
+            (intent, self._extract_entities_clean(clean_message, now))
+            for intent, clean_message in self._classify_messages(messages)
+        ]
+    
     def classify_intent(self, message: str) -> str:
         """Classify the intent of a message using semantic similarity"""
-        # Clean the message first
-        clean_message = self.clean_message(message)
-        
-        # Encode the message
-        message_embedding = self.model.encode([clean_message])
-        
-        # Find the best matching intent
-        best_intent = 'unknown'
-        best_score = 0.0
-        
-        # Check each intent category
-        for intent, phrases in self.common_sayings.items():
-            # Encode all phrases for this intent
-            intent_embeddings = self.model.encode(phrases)
-            
-            # Calculate cosine similarity
-            similarities = cosine_similarity(message_embedding, intent_embeddings)
-            max_similarity = np.max(similarities)
-            
-            if max_similarity > best_score:
-                best_score = max_similarity
-                best_intent = intent
-        
-        # If semantic similarity is too low, use fallback
-        if best_score < 0.5:
-            return self._fallback_classification(clean_message)
-        
-        return best_intent
+        return self._classify_messages([message])[0][0]
+    
+    def _classify_messages(self, messages: List[str]) -> List[Tuple[str, str]]:
+        """Classify raw messages, returning each intent and the cleaned text it used
+        
+        The spell check is only run on messages whose regex-cleaned text doesn't
+        already match an intent with high confidence; those are re-encoded together.
+        """
+        fast_cleaned = [self._fast_clean(message) for message in messages]
+        clean_messages = list(fast_cleaned)
+        results = self._best_intents(clean_messages)
+        
+        respelled = {}
+        for i, (intent, score) in enumerate(results):
+            if intent is None or score < CONFIDENT_SIMILARITY:
+                spell_checked = self._deep_clean(clean_messages[i])
+                if spell_checked != clean_messages[i]:
+                    respelled[i] = clean_messages[i] = spell_checked
+        if respelled:
+            for i, result in zip(respelled, self._best_intents(list(respelled.values()))):
+                results[i] = result
+        
+        classified = []
+        for fast_clean, clean_message, (intent, score) in zip(fast_cleaned, clean_messages, results):
+            # If semantic similarity is too low, use fallback
+            if intent is None or score < MIN_SIMILARITY:
+                intent = self._fallback_classification(clean_message)
+            self._remember_classified_text(fast_clean, clean_message)
+            classified.append((intent, clean_message))
+        return classified
+    
+    def _best_intents(self, clean_messages: List[str]) -> List[Tuple[Optional[str], float]]:
+        """Return each message's closest intent and its cosine similarity (None if there are no examples)"""
+        if not self.intent_names:
+            return [(None, 0.0)] * len(clean_messages)
+        
+        # Encode the messages in one batch
+        message_embeddings = self.model.encode(
+            clean_messages, normalize_embeddings=True, show_progress_bar=False
+        )
+        
+        # Cosine similarity against every example in one matrix product, then the
+        # best score within each intent's run of examples
+        similarities = message_embeddings.astype(np.float32, copy=False) @ self.example_embeddings.T
+        intent_scores = np.maximum.reduceat(similarities, self.intent_slice_starts, axis=1)
+        best = intent_scores.argmax(axis=1)
+        return [
+            (self.intent_names[intent], float(intent_scores[row, intent]))
+            for row, intent in enumerate(best)
+        ]
     
     def _fallback_classification(self, message: str) -> str:
         """Fallback classification using keyword patterns when semantic similarity fails"""
-        message_lower = message.lower()
-        
-        # Priority order: schedule > calendar > food > water > gym > reminders > todos > photo > drive
-        
-        # Schedule queries (highest priority)
-        schedule_patterns = [
-            'schedule', 'what\'s', 'what is', 'what do i have', 'what\'s happening',
-            'what\'s going on', 'what\'s planned', 'what\'s coming up', 'check my',
-            'show my', 'my schedule', 'my calendar'
-        ]
-        if any(pattern in message_lower for pattern in schedule_patterns):
-            return 'schedule_check'
-        
-        # Calendar events
-        calendar_patterns = [
-            'meeting', 'appointment', 'lunch with', 'dinner with', 'coffee with',
-            'block', 'schedule', 'add event', 'create event', 'new event'
-        ]
-        if any(pattern in message_lower for pattern in calendar_patterns):
-            return 'calendar_event'
-        
-        # Food logging (prioritize over gym)
-        food_patterns = [
-            'ate', 'had', 'consumed', 'breakfast', 'lunch', 'dinner', 'snack',
-            'chicken', 'rice', 'salad', 'pasta', 'protein', 'shake', 'smoothie',
-            'apple', 'banana', 'ice cream', 'tub of', 'half of', 'quarter of'
-        ]
-        if any(pattern in message_lower for pattern in food_patterns):
-            return 'food_logging'
-        
-        # Water logging
-        water_patterns = [
-            'drank', 'water', 'bottle', 'oz', 'ml', 'liter', 'litre'
-        ]
-        if any(pattern in message_lower for pattern in water_patterns):
-            return 'water_logging'
-        
-        # Gym workouts
-        gym_patterns = [
-            'workout', 'gym', 'lifted', 'bench', 'squat', 'deadlift', 'pull up',
-            'push up', 'crunch', 'plank', 'cardio', 'ran', 'biked', 'swam'
-        ]
-        if any(pattern in message_lower for pattern in gym_patterns):
-            return 'gym_workout'
-        
-        # Reminders
-        reminder_patterns = [
-            'remind', 'reminder', 'don\'t forget', 'remember to'
-        ]
-        if any(pattern in message_lower for pattern in reminder_patterns):
-            return 'reminder_set'
-        
-        # Todos
-        todo_patterns = [
-            'todo', 'task', 'add to', 'create', 'new'
-        ]
-        if any(pattern in message_lower for pattern in todo_patterns):
-            return 'todo_add'
-        
-        # Photo uploads
-        photo_patterns = [
-            'photo', 'image', 'picture', 'receipt', 'document', 'save this'
-        ]
-        if any(pattern in message_lower for pattern in photo_patterns):
-            return 'photo_upload'
-        
-        # Drive organization
-        drive_patterns = [
-            'organize', 'folder', 'categorize', 'file', 'put in', 'move to'
-        ]
-        if any(pattern in message_lower for pattern in drive_patterns):
-            return 'drive_organization'
+        # One scan over the message; each position reports the highest priority
+        # keyword starting there, and the best rank overall wins
+        best_rank = None
+        for match in FALLBACK_KEYWORD_RE.finditer(message.lower()):
+            rank = match.lastindex
+            if best_rank is None or rank < best_rank:
+                best_rank = rank
+                if rank == 1:
+                    break
         
-        return 'unknown'
+        if best_rank is None:
+            return 'unknown'
+        return FALLBACK_INTENT_KEYWORDS[best_rank - 1][0]
     
-    def extract_entities(self, message: str) -> Dict:
+    def extract_entities(self, message: str, now: Optional[datetime] = None) -> Dict:
         """Extract entities using intelligent parsing"""
-        clean_message = self.clean_message(message)
-        
+        return self._extract_entities_clean(self.clean_message(message), now or datetime.now())
+    
+    def _extract_entities_clean(self, clean_message: str, now: datetime) -> Dict:
+        """Extract entities from an already cleaned message, relative to `now`"""
+        message_lower = clean_message.lower()
         entities = {
             'people': self._extract_people(clean_message),
-            'times': self._extract_times(clean_message),
-            'dates': self._extract_dates(clean_message),
+            'times': self._extract_times(clean_message, message_lower),
+            'dates': self._extract_dates(clean_message, now, message_lower),
             'durations': self._extract_durations(clean_message),
             'locations': self._extract_locations(clean_message),
             'numbers': self._extract_numbers(clean_message),
@@ -363,8 +654,7 @@ class IntelligentNLPProcessor:
         people = []
         
         # Look for "with [name]" pattern
-        with_pattern = r'with\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)'
-        matches = re.finditer(with_pattern, message, re.IGNORECASE)
+        matches = WITH_PERSON_RE.finditer(message)
         
         for match in matches:
             name = match.group(1).strip()
@@ -372,8 +662,7 @@ class IntelligentNLPProcessor:
                 people.append(name)
         
         # Look for "meeting with [name]" pattern
-        meeting_pattern = r'meeting\s+with\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)'
-        matches = re.finditer(meeting_pattern, message, re.IGNORECASE)
+        matches = MEETING_PERSON_RE.finditer(message)
         
         for match in matches:
             name = match.group(1).strip()
@@ -382,19 +671,13 @@ class IntelligentNLPProcessor:
         
         return people
     
-    def _extract_times(self, message: str) -> List[Dict]:
+    def _extract_times(self, message: str, message_lower: Optional[str] = None) -> List[Dict]:
         """Extract time expressions"""
         times = []
         
         # Pattern: 3pm, 2:30pm, 14:00
-        time_patterns = [
-            r'(\d{1,2}):?(\d{2})?\s*(am|pm)?',
-            r'(\d{1,2})\s*(am|pm)',
-            r'(\d{1,2})\s*oclock'
-        ]
-        
-        for pattern in time_patterns:
-            matches = re.finditer(pattern, message, re.IGNORECASE)
+        for pattern in TIME_RES:
+            matches = pattern.finditer(message)
             for match in matches:
                 times.append({
                     'text': match.group(0),
@@ -403,50 +686,45 @@ class IntelligentNLPProcessor:
                 })
         
         # Add time-of-day expressions
+        message_lower = message_lower or message.lower()
         for time_word in self.time_patterns.keys():
-            if time_word in message.lower():
+            start = message_lower.find(time_word)
+            if start >= 0:
                 times.append({
                     'text': time_word,
-                    'start': message.lower().find(time_word),
-                    'end': message.lower().find(time_word) + len(time_word)
+                    'start': start,
+                    'end': start + len(time_word)
                 })
         
         return times
     
-    def _extract_dates(self, message: str) -> List[Dict]:
+    def _extract_dates(self, message: str, now: Optional[datetime] = None,
+                       message_lower: Optional[str] = None) -> List[Dict]:
         """Extract date expressions"""
         dates = []
+        today = (now or datetime.now()).date()
+        message_lower = message_lower or message.lower()
         
         # Relative dates
-        relative_patterns = {
-            'today': 0,
-            'tomorrow': 1,
-            'tonight': 0,
-            'this evening': 0,
-            'this afternoon': 0,
-            'this morning': 0
-        }
-        
-        for date_word, days_offset in relative_patterns.items():
-            if date_word in message.lower():
+        for date_word, days_offset in RELATIVE_DATE_OFFSETS.items():
+            start = message_lower.find(date_word)
+            if start != -1:
                 dates.append({
                     'type': 'relative',
                     'value': date_word,
                     'days_offset': days_offset,
-                    'start': message.lower().find(date_word),
-                    'end': message.lower().find(date_word) + len(date_word)
+                    'start': start,
+                    'end': start + len(date_word)
                 })
         
         # Day names
-        day_pattern = r'(monday|tuesday|wednesday|thursday|friday|saturday|sunday)'
-        matches = re.finditer(day_pattern, message, re.IGNORECASE)
+        matches = DAY_NAME_RE.finditer(message)
         
         for match in matches:
             day_name = match.group(1)
             # Calculate days ahead
-            now = datetime.now()
-            target_day = self._get_next_day(day_name)
-            days_ahead = (target_day - now.date()).days
+            target_day = self._get_next_day(day_name, today)
+            days_ahead = (target_day - today).days
             
             dates.append({
                 'type': 'relative',
@@ -463,8 +741,7 @@ class IntelligentNLPProcessor:
         durations = []
         
         # Time ranges like "3-4pm", "2-5pm"
-        range_pattern = r'(\d{1,2})-(\d{1,2})\s*(am|pm)?'
-        match = re.search(range_pattern, message, re.IGNORECASE)
+        match = TIME_RANGE_RE.search(message)
         
         if match:
             start_hour = int(match.group(1))
@@ -502,8 +779,7 @@ class IntelligentNLPProcessor:
         locations = []
         
         # Look for "at [location]" pattern
-        at_pattern = r'at\s+([^.!?]+?)(?:\s+(?:tomorrow|today|tonight|this|next|on|with|for))'
-        matches = re.finditer(at_pattern, message, re.IGNORECASE)
+        matches = AT_LOCATION_RE.finditer(message)
         
         for match in matches:
             location = match.group(1).strip()
@@ -517,8 +793,7 @@ class IntelligentNLPProcessor:
         numbers = []
         
         # Find all numbers
-        number_pattern = r'\b(\d+\.?\d*)\b'
-        matches = re.finditer(number_pattern, message)
+        matches = NUMBER_RE.finditer(message)
         
         for match in matches:
             numbers.append({
@@ -534,8 +809,7 @@ class IntelligentNLPProcessor:
         exercises = []
         
         # Pattern: exercise weight x reps (e.g., "bench 225x5")
-        exercise_pattern = r'(\w+)\s+(\d+)(?:x|×)(\d+)'
-        matches = re.finditer(exercise_pattern, message)
+        matches = EXERCISE_RE.finditer(message)
         
         for match in matches:
             exercise_name = match.group(1)
@@ -551,27 +825,23 @@ class IntelligentNLPProcessor:
         
         return exercises
     
-    def _get_next_day(self, day_name: str) -> datetime.date:
+    def _get_next_day(self, day_name: str, today=None) -> datetime.date:
         """Get the next occurrence of a day of the week"""
-        now = datetime.now()
-        day_map = {
-            'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-            'friday': 4, 'saturday': 5, 'sunday': 6
-        }
-        
-        target_day = day_map[day_name.lower()]
-        current_day = now.weekday()
+        today = today or datetime.now().date()
+        target_day = DAY_MAP[day_name.lower()]
+        current_day = today.weekday()
         
         days_ahead = (target_day - current_day) % 7
         if days_ahead == 0:  # Same day, go to next week
             days_ahead = 7
         
-        return now.date() + timedelta(days=days_ahead)
+        return today + timedelta(days=days_ahead)
     
-    def parse_calendar_event(self, message: str) -> Optional[Dict]:
-        """Parse calendar event creation from message"""
+    def parse_calendar_event(self, message: str, entities: Optional[Dict] = None) -> Optional[Dict]:
+        """Parse calendar event creation from message (reusing entities from analyze() when given)"""
         clean_message = self.clean_message(message)
-        entities = self.extract_entities(clean_message)
+        if entities is None:
+            entities = self._extract_entities_clean(clean_message, datetime.now())
         
         # Extract event details
         event_time = self._parse_event_time(clean_message, entities)
@@ -639,8 +909,7 @@ class IntelligentNLPProcessor:
         now = datetime.now()
         
         # Pattern: 3pm, 2:30pm, 14:00
-        time_pattern = r'(\d{1,2}):?(\d{2})?\s*(am|pm)?'
-        match = re.search(time_pattern, time_text, re.IGNORECASE)
+        match = TIME_RES[0].search(time_text)
         
         if match:
             hour = int(match.group(1))
@@ -677,21 +946,18 @@ class IntelligentNLPProcessor:
     
     def _extract_event_type(self, message: str) -> str:
         """Extract event type from message"""
-        message_lower = message.lower()
-        
-        event_types = {
-            'meeting': ['meeting', 'mtg', 'sync'],
-            'call': ['call', 'phone', 'zoom', 'video'],
-            'appointment': ['appointment', 'apt', 'visit'],
-            'lunch': ['lunch', 'dinner', 'breakfast', 'meal'],
-            'workout': ['workout', 'gym', 'exercise', 'training']
-        }
-        
-        for event_type, keywords in event_types.items():
-            if any(keyword in message_lower for keyword in keywords):
-                return event_type
+        # Same one-scan approach as the keyword fallback: lowest group number wins
+        best_rank = None
+        for match in EVENT_TYPE_RE.finditer(message.lower()):
+            rank = match.lastindex
+            if best_rank is None or rank < best_rank:
+                best_rank = rank
+                if rank == 1:
+                    break
         
-        return 'event'
+        if best_rank is None:
+            return 'event'
+        return EVENT_TYPE_KEYWORDS[best_rank - 1][0]
     
     def _generate_event_title(self, message: str, people: List[str], event_type: str) -> str:
         """Generate event title"""
@@ -713,10 +979,11 @@ class IntelligentNLPProcessor:
             else:
                 return f"{event_type.title()}"
     
-    def parse_reminder(self, message: str) -> Optional[Dict]:
-        """Parse reminder information from message"""
+    def parse_reminder(self, message: str, entities: Optional[Dict] = None) -> Optional[Dict]:
+        """Parse reminder information from message (reusing entities from analyze() when given)"""
         clean_message = self.clean_message(message)
-        entities = self.extract_entities(clean_message)
+        if entities is None:
+            entities = self._extract_entities_clean(clean_message, datetime.now())
         
         # Extract reminder text
         reminder_text = self._extract_reminder_text(clean_message)
@@ -735,9 +1002,25 @@ class IntelligentNLPProcessor:
             'created_at': datetime.now()
         }
     
-    def parse_gym_workout(self, message: str) -> Optional[Dict]:
-        """Parse gym workout information from message"""
-        entities = self.extract_entities(message)
+    def parse_todo(self, message: str) -> List[str]:
+        """Parse the task(s) out of a todo message ('todo: milk, eggs' -> ['milk', 'eggs'])"""
+        return self._extract_todo_tasks(self.clean_message(message))
+    
+    def _extract_todo_tasks(self, message: str) -> List[str]:
+        """Extract todo tasks"""
+        tasks = []
+        for part in TODO_SPLIT_RE.split(TODO_TRIGGER_RE.sub(' ', message)):
+            task = part.strip(TODO_TASK_STRIP)
+            if task.lower().startswith('and '):
+                task = task[4:].strip(TODO_TASK_STRIP)
+            if task:
+                tasks.append(' '.join(task.split()))
+        return tasks
+    
+    def parse_gym_workout(self, message: str, entities: Optional[Dict] = None) -> Optional[Dict]:
+        """Parse gym workout information from message (reusing entities from analyze() when given)"""
+        if entities is None:
+            entities = self.extract_entities(message)
         
         # Extract exercises from entities
         exercises = entities.get('exercises', [])
@@ -757,34 +1040,39 @@ class IntelligentNLPProcessor:
         return {
             'date': date or datetime.now(),
             'exercises': exercises,
+            'muscle_group': self._extract_muscle_group(message, exercises),
             'message': message
         }
     
+    def _extract_muscle_group(self, message: str, exercises: List[Dict]) -> str:
+        """Muscle group the message names, else the one its exercises work"""
+        match = MUSCLE_GROUP_RE.search(message)
+        if match:
+            return match.group(1).lower()
+        
+        for exercise in exercises:
+            name = exercise['name'].lower()
+            for prefix, muscle_group in EXERCISE_MUSCLE_GROUPS.items():
+                if name.startswith(prefix):
+                    return muscle_group
+        
+        return DEFAULT_MUSCLE_GROUP
+    
     def _extract_exercises_from_text(self, message: str) -> List[Dict]:
         """Extract exercise information from text when entities don't have it"""
         exercises = []
         
         # Look for common exercise patterns
-        exercise_patterns = [
-            r'(\w+)\s+(\d+)x(\d+)',  # bench 225x5
-            r'(\w+)\s+(\d+)\s*x\s*(\d+)',  # bench 225 x 5
-            r'(\w+)\s+(\d+)\s*reps?',  # bench 225 reps
-            r'(\w+)\s+(\d+)\s*for\s*(\d+)',  # bench 225 for 5
-        ]
-        
-        for pattern in exercise_patterns:
-            matches = re.finditer(pattern, message.lower())
-            for match in matches:
-                exercise_name = match.group(1)
-                weight = int(match.group(2))
-                reps = int(match.group(3))
-                
-                exercises.append({
-                    'name': exercise_name,
-                    'weight': weight,
-                    'reps': reps,
-                    'sets': 1
-                })
+        for match in EXERCISE_TEXT_RE.finditer(message.lower()):
+            exercise_name, weight, reps_x, reps_for = match.groups()
+            reps = reps_x or reps_for
+            
+            exercises.append({
+                'name': exercise_name,
+                'weight': int(weight),
+                'reps': int(reps) if reps else None,
+                'sets': 1
+            })
         
         return exercises
     
@@ -796,50 +1084,31 @@ class IntelligentNLPProcessor:
         # Clean the message
         clean_message = self.clean_message(message).lower()
         
-        # Look for food items in the database
-        found_foods = []
-        
-        # Check each food item in the database
-        for food_name, food_data in self.food_db.items():
-            if food_name in clean_message:
-                found_foods.append({
-                    'name': food_name,
-                    'data': food_data
-                })
-        
-        if not found_foods:
+        # Look for food items in the database; the most specific (longest) one wins
+        if not self.food_name_re:
             return None
+        matches = [match.group(0) for match in self.food_name_re.finditer(clean_message)]
+        if not matches:
+            return None
+        food_name, food_data = self.food_items[max(matches, key=len)]
         
         # Extract portion information
-        portion_multiplier = self.parse_portion_multiplier(clean_message)
-        
-        # Return the first found food (you could enhance this to handle multiple foods)
-        food_item = found_foods[0]
+        portion_multiplier = self._parse_portion_multiplier_lower(clean_message)
         
         return {
-            'food_name': food_item['name'],
-            'food_data': food_item['data'],
+            'food_name': food_name,
+            'food_data': food_data,
             'portion_multiplier': portion_multiplier,
-            'restaurant': food_item['data'].get('restaurant', 'unknown')
+            'restaurant': food_data.get('restaurant', 'unknown')
         }
     
     def _extract_food_from_text(self, message: str) -> List[str]:
         """Extract food items from text when entities don't have them"""
-        # Common food keywords
-        food_keywords = [
-            'ice cream', 'chicken', 'beef', 'pork', 'fish', 'salmon', 'tuna',
-            'rice', 'pasta', 'bread', 'toast', 'eggs', 'oatmeal', 'cereal',
-            'apple', 'banana', 'orange', 'grapes', 'berries', 'vegetables',
-            'broccoli', 'carrots', 'spinach', 'lettuce', 'tomato', 'onion',
-            'potato', 'sweet potato', 'corn', 'peas', 'beans', 'nuts',
-            'almonds', 'walnuts', 'peanuts', 'protein bar', 'shake', 'smoothie'
-        ]
-        
+        # One scan; the longest keyword wins where they overlap ('sweet potato', not 'potato')
         found_foods = []
-        message_lower = message.lower()
-        
-        for food in food_keywords:
-            if food in message_lower:
+        for match in FOOD_KEYWORD_RE.finditer(message.lower()):
+            food = match.group(0)
+            if food not in found_foods:
                 found_foods.append(food)
         
         return found_foods
@@ -857,89 +1126,40 @@ class IntelligentNLPProcessor:
             except (ValueError, IndexError):
                 pass
         
-        # Look for common water amounts in text
-        message_lower = message.lower()
-        water_patterns = [
-            r'(\d+(?:\.\d+)?)\s*(?:oz|ounce|ounces)',
-            r'(\d+(?:\.\d+)?)\s*(?:ml|milliliter|milliliters)',
-            r'(\d+(?:\.\d+)?)\s*(?:cup|cups)',
-            r'(\d+(?:\.\d+)?)\s*(?:glass|glasses)',
-            r'(\d+(?:\.\d+)?)\s*(?:bottle|bottles)'
-        ]
-        
-        for pattern in water_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                amount = float(match.group(1))
-                # Convert to ml based on unit
-                if 'oz' in match.group(0) or 'ounce' in match.group(0):
-                    return amount * 29.5735
-                elif 'cup' in match.group(0):
-                    return amount * 236.588  # 1 cup = 236.588 ml
-                elif 'glass' in match.group(0):
-                    return amount * 236.588  # Assume 1 glass = 1 cup
-                elif 'bottle' in match.group(0):
-                    return amount * 500  # Assume 1 bottle = 500 ml
-                else:
-                    return amount  # Assume ml
+        # Look for common water amounts in text, converting to ml based on unit
+        match = WATER_AMOUNT_RE.search(message.lower())
+        if match:
+            return float(match.group(1)) * WATER_UNIT_ML[match.group(2)]
         
         # Default amount if nothing found
         return 500.0  # 500 ml default
     
     def parse_portion_multiplier(self, message: str) -> float:
         """Parse portion multiplier from message"""
-        message_lower = message.lower()
-        
+        return self._parse_portion_multiplier_lower(message.lower())
+    
+    def _parse_portion_multiplier_lower(self, message_lower: str) -> float:
+        """Parse portion multiplier from an already lowercased message"""
         # Look for common portion indicators
-        portion_patterns = [
-            r'(\d+(?:\.\d+)?)\s*(?:serving|servings)',
-            r'(\d+(?:\.\d+)?)\s*(?:piece|pieces)',
-            r'(\d+(?:\.\d+)?)\s*(?:slice|slices)',
-            r'(\d+(?:\.\d+)?)\s*(?:bowl|bowls)',
-            r'(\d+(?:\.\d+)?)\s*(?:plate|plates)',
-            r'(\d+(?:\.\d+)?)\s*(?:cup|cups)',
-            r'(\d+(?:\.\d+)?)\s*(?:tablespoon|tablespoons|tbsp)',
-            r'(\d+(?:\.\d+)?)\s*(?:teaspoon|teaspoons|tsp)'
-        ]
-        
-        for pattern in portion_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                try:
-                    return float(match.group(1))
-                except ValueError:
-                    continue
-        
-        # Look for fractions
-        fraction_patterns = [
-            r'(\d+)/(\d+)',  # 1/2, 3/4, etc.
-            r'(\d+)\s*&\s*(\d+)/(\d+)',  # 1 & 1/2
-        ]
+        match = PORTION_RE.search(message_lower)
+        if match:
+            return float(match.group(1))
         
-        for pattern in fraction_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                try:
-                    if len(match.groups()) == 2:
-                        # Simple fraction like 1/2
-                        numerator = float(match.group(1))
-                        denominator = float(match.group(2))
-                        return numerator / denominator
-                    elif len(match.groups()) == 3:
-                        # Mixed fraction like 1 & 1/2
-                        whole = float(match.group(1))
-                        numerator = float(match.group(2))
-                        denominator = float(match.group(3))
-                        return whole + (numerator / denominator)
-                except ValueError:
-                    continue
+        # Look for fractions: simple (1/2) or mixed (1 & 1/2)
+        match = FRACTION_RE.search(message_lower)
+        if match:
+            whole, numerator, denominator = match.groups()
+            denominator = int(denominator)
+            if denominator:
+                return int(whole or 0) + int(numerator) / denominator
         
         # Default multiplier
         return 1.0
     
-    def parse_schedule_query(self, message: str) -> Optional[Dict]:
-        """Parse schedule query from message"""
-        entities = self.extract_entities(message)
+    def parse_schedule_query(self, message: str, entities: Optional[Dict] = None) -> Optional[Dict]:
+        """Parse schedule query from message (reusing entities from analyze() when given)"""
+        if entities is None:
+            entities = self.extract_entities(message)
         
         # Extract date
         date = None
@@ -955,9 +1175,10 @@ class IntelligentNLPProcessor:
             'message': message
         }
     
-    def parse_photo_upload(self, message: str) -> Optional[Dict]:
-        """Parse photo upload information from message"""
-        entities = self.extract_entities(message)
+    def parse_photo_upload(self, message: str, entities: Optional[Dict] = None) -> Optional[Dict]:
+        """Parse photo upload information from message (reusing entities from analyze() when given)"""
+        if entities is None:
+            entities = self.extract_entities(message)
         
         # Extract folder/destination
         locations = entities.get('locations', [])
@@ -967,15 +1188,9 @@ class IntelligentNLPProcessor:
         
         # Look for folder patterns in text
         if not folder:
-            folder_patterns = [
-                r'(?:to|in|into)\s+(\w+\s+folder)',
-                r'(?:to|in|into)\s+(\w+\s+album)',
-                r'(?:to|in|into)\s+(\w+\s+drive)',
-                r'(?:to|in|into)\s+(\w+)',  # Generic destination
-            ]
-            
-            for pattern in folder_patterns:
-                match = re.search(pattern, message.lower())
+            message_lower = message.lower()
+            for pattern in FOLDER_RES:
+                match = pattern.search(message_lower)
                 if match:
                     folder = match.group(1)
                     break
@@ -992,24 +1207,28 @@ class IntelligentNLPProcessor:
     
     def _extract_reminder_text(self, message: str) -> Optional[str]:
         """Extract reminder text"""
-        # Look for reminder triggers
-        triggers = ['remind me to', 'reminder to', 'don\'t forget to', 'call', 'text', 'email']
-        
-        for trigger in triggers:
-            if trigger in message.lower():
-                start_idx = message.lower().find(trigger) + len(trigger)
-                reminder_text = message[start_idx:].strip()
-                
-                # Clean up time references
-                reminder_text = re.sub(r'\b(this evening|tonight|tomorrow|today)\b', '', reminder_text, flags=re.IGNORECASE)
-                reminder_text = reminder_text.strip()
-                
-                if reminder_text:
-                    return reminder_text
+        # Look for the highest priority reminder trigger; the reminder is whatever follows it
+        match = REMINDER_TRIGGER_RE.search(message)
+        if not match:
+            return None
         
-        return None
+        # Clean up time references
+        reminder_text = REMINDER_TIME_WORDS_RE.sub(' ', match.group(1)).strip()
+        return reminder_text or None
 
 # Factory function
+# (food_database, processor) from the last call, reused while the same database is passed
+_shared_processor = None
+_processor_lock = threading.Lock()
+
 def create_intelligent_processor(food_database: Dict) -> IntelligentNLPProcessor:
-    """Create an intelligent NLP processor"""
-    return IntelligentNLPProcessor()
+    """Create an intelligent NLP processor for food_database
+    
+    Calls with the same database object share one processor; a different
+    database gets a processor of its own (the sentence transformer is still shared).
+    """
+    global _shared_processor
+    with _processor_lock:
+        if _shared_processor is None or _shared_processor[0] is not food_database:
+            _shared_processor = (food_database, IntelligentNLPProcessor(food_database))
+        return _shared_processor[1]
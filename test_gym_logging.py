@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+End-to-end test for gym logging: NLP parse -> one gym_logs row per exercise
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('sentence_transformers')
+pytest.importorskip('spellchecker')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from hugging_face_nlp import IntelligentNLPProcessor, DEFAULT_MUSCLE_GROUP
+
+# Same table and statement app.py uses (init_db / SQL_LOG_EXERCISE)
+GYM_LOGS_TABLE = '''
+    CREATE TABLE gym_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        exercise TEXT NOT NULL,
+        sets INTEGER,
+        reps INTEGER,
+        weight REAL,
+        notes TEXT
+    )
+'''
+SQL_LOG_EXERCISE = '''
+    INSERT INTO gym_logs (exercise, sets, reps, weight, notes)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+@pytest.fixture(scope='module')
+def processor():
+    # The text parsers don't touch the model, so skip loading it
+    return IntelligentNLPProcessor.__new__(IntelligentNLPProcessor)
+
+@pytest.fixture
+def db(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'gym.db'))
+    conn.execute(GYM_LOGS_TABLE)
+    yield conn
+    conn.close()
+
+def log_gym_workout(db, workout_data):
+    """Write the parsed workout the way EnhancedMessageProcessor.log_gym_workout does"""
+    muscle_group = workout_data.get('muscle_group') or DEFAULT_MUSCLE_GROUP
+    with db:
+        db.executemany(SQL_LOG_EXERCISE, [
+            (ex['name'], ex['sets'], ex['reps'], ex['weight'], muscle_group)
+            for ex in workout_data['exercises']
+        ])
+
+def test_gym_message_logs_each_exercise(processor, db):
+    """A gym SMS is parsed and logged one row per exercise with its muscle group"""
+    workout = processor.parse_gym_workout("hit chest today: bench 225x5, incline 185x8", {})
+    assert workout['muscle_group'] == 'chest'
+
+    log_gym_workout(db, workout)
+    rows = db.execute('SELECT exercise, sets, reps, weight, notes FROM gym_logs ORDER BY id').fetchall()
+    assert rows == [('bench', 1, 5, 225, 'chest'), ('incline', 1, 8, 185, 'chest')]
+
+def test_gym_message_without_muscle_group_uses_exercises(processor, db):
+    """The muscle group falls back to what the exercises work"""
+    workout = processor.parse_gym_workout("squat 315x3", {})
+    assert workout['muscle_group'] == 'legs'
+
+    log_gym_workout(db, workout)
+    assert db.execute('SELECT exercise, notes FROM gym_logs').fetchall() == [('squat', 'legs')]
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-v']))
@@ -26,7 +26,10 @@ def test_hugging_face_nlp():
         "add this photo to work folder"
     ]
     
-    for message in test_messages:
+    # Classify and extract entities for every message in one encoder batch
+    results = processor.analyze_batch(test_messages)
+    
+    for message, (intent, entities) in zip(test_messages, results):
         print(f"\n📝 Testing: '{message}'")
         print("-" * 50)
         
@@ -34,17 +37,13 @@ def test_hugging_face_nlp():
         clean_message = processor.clean_message(message)
         print(f"🧹 Cleaned: '{clean_message}'")
         
-        # Test intent classification
-        intent = processor.classify_intent(message)
+        # Intent classification and entity extraction
         print(f"🎯 Intent: {intent}")
-        
-        # Test entity extraction
-        entities = processor.extract_entities(message)
         print(f"🔍 Entities: {entities}")
         
         # Test specific parsing based on intent
         if intent == 'calendar_event':
-            event_data = processor.parse_calendar_event(message)
+            event_data = processor.parse_calendar_event(message, entities)
             if event_data:
                 print(f"✅ Calendar event parsed:")
                 print(f"   Title: {event_data['title']}")
@@ -56,7 +55,7 @@ def test_hugging_face_nlp():
                 print("❌ Calendar event parsing failed")
         
         elif intent == 'reminder_set':
-            reminder_data = processor.parse_reminder(message)
+            reminder_data = processor.parse_reminder(message, entities)
             if reminder_data:
                 print(f"✅ Reminder parsed:")
                 print(f"   Text: {reminder_data['text']}")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the NLP processor's text parsers
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('sentence_transformers')
+pytest.importorskip('spellchecker')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from hugging_face_nlp import IntelligentNLPProcessor
+
+@pytest.fixture(scope='module')
+def processor():
+    # The text parsers don't touch the model, so skip loading it
+    return IntelligentNLPProcessor.__new__(IntelligentNLPProcessor)
+
+def test_reminder_text_prefers_higher_priority_trigger(processor):
+    """'remind me to' wins over a 'call' that appears earlier in the message"""
+    message = "before my call with Dan remind me to print the deck"
+    assert processor._extract_reminder_text(message) == "print the deck"
+
+def test_reminder_text_strips_time_words(processor):
+    assert processor._extract_reminder_text("remind me to call mom this evening") == "call mom"
+
+def test_reminder_text_falls_back_to_lower_priority_trigger(processor):
+    assert processor._extract_reminder_text("call mom tomorrow") == "mom"
+
+def test_todo_single_task(processor):
+    assert processor._extract_todo_tasks("add buy milk to my todo list") == ["buy milk"]
+
+def test_todo_several_tasks(processor):
+    message = "todo: pick up laundry, call the bank, and book flights"
+    assert processor._extract_todo_tasks(message) == ["pick up laundry", "call the bank", "book flights"]
+
+def test_todo_keeps_and_inside_a_task(processor):
+    assert processor._extract_todo_tasks("remember to buy mac and cheese") == ["buy mac and cheese"]
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-v']))